@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+# roster puts the repository root on sys.path for the src imports below
+from roster import BASE_DIR, cached_roster
+
+from src.api_server import run_server
+
+# Drives the local JSON API with concurrent keep-alive clients and reports throughput and latency.
+# Either point it at a running `main.py serve` with --url, or let it start one on a copy of --db / --students.
+CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'settings.json')
+# Relative weights of each request kind in the generated traffic
+READ_MIX = (("search", 5), ("lookup", 10), ("summary", 2), ("health", 1))
+SEARCH_TERMS = ("santos", "reyes ma", "cruz", "garcia j", "mendoza", "torres", "flores ana", "ramos")
+
+
+class Client:
+    # One keep-alive HTTP/1.1 connection
+    def __init__(self, host, port, token=None):
+        self.host = host
+        self.port = port
+        self.auth = f"Authorization: Bearer {token}\r\n" if token else ""
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n{self.auth}\r\n")
+        self.writer.write(head.encode("latin-1") + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length)
+        return status, json.loads(data) if data else None
+
+    def close(self):
+        if self.writer: self.writer.close()
+
+
+def next_request(rng, ids, write_ratio):
+    if rng.random() < write_ratio:
+        s_id = rng.choice(ids)
+        scores = {key: round(rng.uniform(60, 100), 1) for key in ("attendance", "quiz", "midterm", "final")}
+        return "update", "PUT", f"/api/students/{s_id}", {"full_name": "Load, Test", **scores}
+    kind = rng.choices([kind for kind, _ in READ_MIX], [weight for _, weight in READ_MIX])[0]
+    if kind == "search":
+        return kind, "GET", f"/api/students?q={quote(rng.choice(SEARCH_TERMS))}&limit=20", None
+    if kind == "lookup":
+        return kind, "GET", f"/api/students/{rng.choice(ids)}", None
+    return kind, "GET", "/api/stats/summary" if kind == "summary" else "/api/health", None
+
+
+async def worker(host, port, token, queue, ids, write_ratio, seed, latencies, errors):
+    rng = random.Random(seed)
+    client = Client(host, port, token)
+    try:
+        while queue:
+            queue.pop()
+            kind, method, path, payload = next_request(rng, ids, write_ratio)
+            start = time.perf_counter()
+            try:
+                status, _ = await client.request(method, path, payload)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                errors.append(f"{kind}: {e}")
+                client.close()
+                client = Client(host, port, token)
+                continue
+            latencies.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors.append(f"{kind}: HTTP {status}")
+    finally:
+        client.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_stats(samples):
+    return {"requests": len(samples), "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3), "p99_ms": round(percentile(samples, 99), 3),
+            "mean_ms": round(statistics.fmean(samples), 3)}
+
+
+async def run_load(host, port, token, clients, requests, write_ratio, seed):
+    # Student IDs for lookups and updates come from the server itself
+    probe = Client(host, port)
+    status, body = await probe.request("GET", "/api/students?limit=1000")
+    probe.close()
+    ids = [student["student_id"] for student in body["students"]] if status == 200 else []
+    if not ids:
+        raise RuntimeError("The server has no students to query.")
+
+    queue = list(range(requests))
+    latencies, errors = {}, []
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, token, queue, ids, write_ratio, seed + i, latencies, errors)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    samples = [ms for kind_samples in latencies.values() for ms in kind_samples]
+    return {
+        "clients": clients,
+        "requests": len(samples),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        "errors": len(errors),
+        "error_samples": errors[:10],
+        "latency": latency_stats(samples),
+        "by_kind": {kind: latency_stats(kind_samples) for kind, kind_samples in sorted(latencies.items())},
+    }
+
+
+def start_local_server(db_path, readers):
+    # Serves db_path from a daemon thread on a free port; returns (host, port)
+    with open(CONFIG_PATH) as f:
+        config = json.load(f)
+    ready = threading.Event()
+    address = []
+
+    def on_ready(sockname):
+        address.extend(sockname[:2])
+        ready.set()
+
+    threading.Thread(target=run_server, args=(db_path, config, "127.0.0.1", 0, readers, on_ready), daemon=True).start()
+    if not ready.wait(30):
+        raise RuntimeError("The API server did not start.")
+    return address[0], address[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the EduMatrix JSON API.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="a running server, e.g. http://127.0.0.1:8765")
+    target.add_argument("--db", help="start a server on a temporary copy of this database")
+    target.add_argument("--students", type=int, default=10000,
+                        help="start a server on a synthetic roster of this size (default)")
+    parser.add_argument("--token", help="API token of the server given with --url, if it has one")
+    parser.add_argument("--readers", type=int, default=4, help="reader threads for a server started here")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="share of requests that update a student")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            # Updates are real writes, so the server always works on a throwaway copy
+            path = os.path.join(tmp, "load_test.db")
+            shutil.copyfile(args.db or cached_roster(args.students), path)
+            host, port = start_local_server(path, args.readers)
+
+        report = asyncio.run(run_load(host, port, args.token, args.clients, args.requests, args.write_ratio, args.seed))
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Measures a cold launch of the desktop app up to an interactive login screen.
+# Every run is a fresh interpreter so module import costs are counted each time.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, 'database', 'academic_data.db')
+CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'settings.json')
+ICON_PATH = os.path.join(BASE_DIR, 'assets', 'app_icon.ico')
+
+# Modules that must not be loaded before the Intelligence Hub is opened
+DEFERRED_MODULES = ("matplotlib",)
+
+CHILD_SCRIPT = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from src.data_engine import DataEngine
+from src.math_core import AnalyticsEngine
+from src.ui_modern import ModernUI
+t_import = time.perf_counter()
+
+with open(sys.argv[3]) as f:
+    config = json.load(f)
+db = DataEngine(sys.argv[2], config['grading_weights'], config.get('thresholds'))
+math_eng = AnalyticsEngine(config['grading_weights'], config.get('thresholds'))
+t_engines = time.perf_counter()
+
+login_ms = None
+try:
+    app = ModernUI(lambda u, p: False, db, math_eng, sys.argv[4])
+    app.update()
+    login_ms = (time.perf_counter() - t0) * 1000
+    app.destroy()
+except Exception as e:
+    # No display available; only the import and engine phases can be timed
+    if type(e).__name__ != "TclError": raise
+db.close()
+
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "engines_ms": (t_engines - t_import) * 1000,
+    "login_ready_ms": login_ms,
+    "deferred_loaded": sorted(m for m in sys.argv[5].split(",") if m in sys.modules),
+}))
+"""
+
+
+def run_once(db_path):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, BASE_DIR, db_path, CONFIG_PATH, ICON_PATH,
+                          ",".join(DEFERRED_MODULES)], capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a cold start of EduMatrix up to the login screen.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="exit with status 1 if the median process time exceeds this")
+    args = parser.parse_args()
+
+    # Work on a copy so schema migrations never touch the shipped database
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        shutil.copyfile(DB_PATH, db_path)
+        run_once(db_path)  # first launch migrates the copy; keep it out of the timings
+        runs = [run_once(db_path) for _ in range(args.runs)]
+
+    report = {"runs": args.runs, "deferred_loaded": sorted({m for r in runs for m in r["deferred_loaded"]})}
+    for field in ("process_ms", "import_ms", "engines_ms", "login_ready_ms"):
+        values = [r[field] for r in runs if r[field] is not None]
+        report[field] = round(statistics.median(values), 1) if values else None
+    print(json.dumps(report, indent=2))
+
+    if report["deferred_loaded"]:
+        return 1
+    if args.max_ms is not None and report["process_ms"] > args.max_ms:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
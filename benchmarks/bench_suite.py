@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# roster puts the repository root on sys.path for the src imports below
+from roster import BASE_DIR, cached_roster, student_id
+
+from src.data_engine import DataEngine
+from src.math_core import AnalyticsEngine
+
+# Times the DataEngine / AnalyticsEngine hot paths against synthetic rosters and compares with a baseline.
+# Results are milliseconds per operation; the median of --repeat runs is reported.
+BASELINE_PATH = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+WEIGHTS = {"quiz": 0.2, "midterm": 0.4, "final": 0.4}
+# Single-row writes are timed over this many calls and reported per call
+WRITE_OPS = 200
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_size(students, repeat, tmp):
+    path = os.path.join(tmp, f"bench_{students}.db")
+    shutil.copyfile(cached_roster(students), path)
+    results = {}
+    with DataEngine(path, WEIGHTS) as db:
+        math_eng = AnalyticsEngine(WEIGHTS)
+        # The last WRITE_OPS students are deleted and then added back, so every run ends where it started
+        ids = [student_id(students - 1 - i) for i in range(WRITE_OPS)]
+
+        def delete_records():
+            for s_id in ids:
+                db.delete_record(s_id)
+
+        def add_records():
+            for s_id in ids:
+                db.add_student_record(s_id, "Bench, Student", "BSIT", 1, 90, 80, 85, 88, "A")
+
+        delete_samples, add_samples = [], []
+        for _ in range(repeat):
+            delete_samples.append(timed(delete_records, 1) / WRITE_OPS)
+            add_samples.append(timed(add_records, 1) / WRITE_OPS)
+        results["delete_record"] = statistics.median(delete_samples)
+        results["add_student_record"] = statistics.median(add_samples)
+
+        results["fetch_analytics_data"] = timed(db.fetch_analytics_data, repeat)
+        results["get_snapshot"] = timed(lambda: (db._mark_changed(), db.get_snapshot()), repeat)
+        # _mark_changed empties the search cache, so these time the SQLite path
+        results["search_students"] = timed(
+            lambda: (db._mark_changed(), db.search_students("santos ma", limit=500)), repeat)
+        results["search_students_id"] = timed(
+            lambda: (db._mark_changed(), db.search_students(student_id(students // 2))), repeat)
+        results["search_students_cached"] = timed(lambda: db.search_students("santos ma", limit=500), repeat)
+        results["get_summary_stats"] = timed(db.get_summary_stats, repeat)
+        results["fetch_page"] = timed(lambda: db.fetch_page("gpa"), repeat)
+
+        snap = db.get_snapshot()
+        results["weighted_gpas"] = timed(
+            lambda: math_eng.calculate_weighted_gpas(snap["quiz"], snap["midterm"], snap["final"]), repeat)
+        results["predict_performance"] = timed(
+            lambda: math_eng.predict_performance(snap["attendance"], snap["gpa"]), repeat)
+
+        export_path = os.path.join(tmp, "export.csv")
+        results["export_csv"] = timed(lambda: db.export_csv(export_path, math_eng), repeat)
+    return {op: round(ms, 3) for op, ms in results.items()}
+
+
+def compare(results, baseline, tolerance):
+    # [(size, op, baseline ms, current ms)] for every operation slower than baseline * (1 + tolerance)
+    regressions = []
+    for size, ops in results.items():
+        for op, ms in ops.items():
+            base = baseline.get("results", {}).get(size, {}).get(op)
+            if base and ms > base * (1 + tolerance):
+                regressions.append((size, op, base, ms))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EduMatrix data and analytics operations.")
+    parser.add_argument("--sizes", default="1k,100k", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            report["results"][size] = bench_size(SIZES[size], args.repeat, tmp)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report["results"], json.load(f), args.tolerance)
+        report["regressions"] = [
+            {"size": size, "operation": op, "baseline_ms": base, "current_ms": ms, "ratio": round(ms / base, 2)}
+            for size, op, base, ms in regressions]
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
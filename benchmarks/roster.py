@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.data_engine import DataEngine
+
+# Generated rosters are reused between runs; they are rebuilt only if missing
+CACHE_DIR = os.path.join(BASE_DIR, 'benchmarks', '.cache')
+# Student IDs are XX-XXXX, so one database holds at most a million students
+MAX_STUDENTS = 1000000
+INSERT_BATCH_SIZE = 20000
+
+FIRST_NAMES = ("Juan", "Maria", "Jose", "Ana", "Mark", "Grace", "Paolo", "Bea", "Carlo", "Liza", "Miguel", "Rica")
+LAST_NAMES = ("Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores", "Ramos", "Castillo",
+              "Villanueva", "Aquino", "Navarro", "Mallorca", "Balagot", "Coleco")
+COURSES = ("BSIT", "BSCS", "BSIS", "BSEMC")
+SECTIONS = ("A", "B", "C", "D")
+
+
+def student_id(index):
+    return f"{index // 10000:02d}-{index % 10000:04d}"
+
+
+def generate_roster(path, students, seed=0):
+    # A schema-current database filled with reproducible synthetic students and grades
+    if students > MAX_STUDENTS:
+        raise ValueError(f"At most {MAX_STUDENTS} students fit the XX-XXXX ID format.")
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = np.random.default_rng(seed)
+    with DataEngine(path) as db:
+        conn = db._connect()
+        for start in range(0, students, INSERT_BATCH_SIZE):
+            count = min(INSERT_BATCH_SIZE, students - start)
+            ids = [student_id(i) for i in range(start, start + count)]
+            first = rng.integers(len(FIRST_NAMES), size=count)
+            last = rng.integers(len(LAST_NAMES), size=count)
+            course = rng.integers(len(COURSES), size=count)
+            year = rng.integers(1, 5, size=count)
+            section = rng.integers(len(SECTIONS), size=count)
+            # Attendance drives the exam scores a little so the regression has something to find
+            attendance = np.clip(rng.normal(85, 10, count), 0, 100).round(1)
+            scores = np.clip(attendance[:, None] * 0.4 + rng.normal(45, 12, (count, 3)), 0, 100).round(1)
+
+            with conn:
+                conn.executemany(
+                    "INSERT INTO students (student_id, full_name, course, year_level, section) VALUES (?, ?, ?, ?, ?)",
+                    [(ids[i], f"{LAST_NAMES[last[i]]}, {FIRST_NAMES[first[i]]}", COURSES[course[i]], int(year[i]),
+                      SECTIONS[section[i]]) for i in range(count)])
+                conn.executemany(
+                    "INSERT INTO grades (student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score) VALUES (?, ?, ?, ?, ?)",
+                    [(ids[i], float(attendance[i]), *map(float, scores[i])) for i in range(count)])
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return path
+
+
+def cached_roster(students, seed=0):
+    path = os.path.join(CACHE_DIR, f"roster_{students}_{seed}.db")
+    if not os.path.exists(path):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        generate_roster(path + ".tmp", students, seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic academic_data.db.")
+    parser.add_argument("students", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_roster(args.output, args.students, args.seed)
+    print(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.data_engine import DataEngine
 from src.math_core import AnalyticsEngine
-from src.ui_modern import ModernUI
+from src.profiler import PROFILER, DEFAULT_DIAGNOSTICS
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,20 +20,34 @@ def load_config():
         return json.load(f)
 
 def main():
+    # Any arguments select the headless CLI (python main.py summary --db ...), which never loads Tk
+    if len(sys.argv) > 1:
+        from src.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
     try:
+        from src.ui_modern import ModernUI
         config = load_config()
+        diagnostics = {**DEFAULT_DIAGNOSTICS, **config.get('diagnostics', {})}
+        PROFILER.configure(diagnostics['enabled'], diagnostics['slow_query_ms'],
+                           os.path.join(BASE_DIR, diagnostics['dump_path']))
         
         # Initialize Engines
-        db = DataEngine(DB_PATH)
-        math_eng = AnalyticsEngine(config['grading_weights'])
-        
-        # Secure Auth Logic
-        def authenticate(u, p):
-            return u == config['security']['admin_user'] and p == config['security']['admin_hash']
+        with DataEngine(DB_PATH, config['grading_weights'], config.get('thresholds')) as db:
+            math_eng = AnalyticsEngine(config['grading_weights'], config.get('thresholds'))
+            # Keeps the running regression sums in step with every write
+            db.add_change_listener(math_eng.on_data_change)
+
+            # Secure Auth Logic
+            def authenticate(u, p):
+                return u == config['security']['admin_user'] and p == config['security']['admin_hash']
+
+            # Launch System
+            app = ModernUI(authenticate, db, math_eng, ICON_PATH)
+            app.mainloop()
 
-        # Launch System
-        app = ModernUI(authenticate, db, math_eng, ICON_PATH)
-        app.mainloop()
+        # Keep what was recorded this session for later inspection
+        if PROFILER.enabled: PROFILER.dump()
         
     except Exception as e:
         print(f"CRITICAL ERROR: {e}")
@@ -0,0 +1,311 @@
+import asyncio
+import hmac
+import ipaddress
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src.data_engine import DataEngine, STUDENT_ID_PATTERN, _scores_in_range
+from src.math_core import AnalyticsEngine
+
+# Local JSON API over DataEngine / AnalyticsEngine for several clients at once.
+# Reads run on a pool of threads, each with its own pooled SQLite connection (WAL lets them run alongside
+# a write); every write goes through one single-threaded executor, so writes are serialized.
+# There is no login, so write requests need the "api.token" of settings.json as "Authorization: Bearer <token>"
+# once one is set, and the server only listens beyond loopback when one is.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_READERS = 4
+MAX_BODY_BYTES = 64 * 1024
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 1000
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiServer:
+    def __init__(self, db, math_engine, readers=DEFAULT_READERS, token=None):
+        self.db = db
+        self.math = math_engine
+        self.token = token or None
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="edumatrix-api-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="edumatrix-api-write")
+        # Whole-table results (summary, honors, at-risk) are reused until the data version changes;
+        # _computing holds the one in-flight computation per cache key
+        self._cache = {}
+        self._computing = {}
+        # (method, path pattern, handler, runs on). "loop" handlers run on the event loop itself and may be
+        # coroutines; "read" / "write" handlers run on the matching executor.
+        self.routes = [
+            ("GET", r"/api/health", self.health, "loop"),
+            ("GET", r"/api/students", self.search, "read"),
+            ("POST", r"/api/students", self.create_student, "write"),
+            ("GET", r"/api/students/(?P<student_id>[^/]+)", self.get_student, "read"),
+            ("PUT", r"/api/students/(?P<student_id>[^/]+)", self.update_student, "write"),
+            ("DELETE", r"/api/students/(?P<student_id>[^/]+)", self.delete_student, "write"),
+            ("GET", r"/api/stats/summary", self.summary, "loop"),
+            ("GET", r"/api/honors", self.honors, "loop"),
+            ("GET", r"/api/at-risk", self.at_risk, "loop"),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler, runs_on)
+                       for method, pattern, handler, runs_on in self.routes]
+
+    # --- HTTP ---
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready: ready(server.sockets[0].getsockname())
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive; one request at a time per connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, target, body, headers)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode()
+        status = HTTPStatus(status)
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, body, headers=None):
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, handler, runs_on in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if runs_on == "write" and not self.authorized(headers or {}):
+                return HTTPStatus.UNAUTHORIZED, {"error": "Missing or invalid API token."}
+            try:
+                payload = json.loads(body) if body else {}
+                if not isinstance(payload, dict):
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object.")
+                if runs_on == "loop":
+                    result = handler(query=query, payload=payload, **match.groupdict())
+                    if asyncio.iscoroutine(result): result = await result
+                    return result
+                executor = self._writer if runs_on == "write" else self._readers
+                result = await asyncio.get_running_loop().run_in_executor(
+                    executor, lambda: handler(query=query, payload=payload, **match.groupdict()))
+                return result
+            except ApiError as e:
+                return e.status, {"error": str(e)}
+            except json.JSONDecodeError:
+                return HTTPStatus.BAD_REQUEST, {"error": "Request body must be JSON."}
+            except Exception as e:
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed on {path}."}
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {path}."}
+
+    def authorized(self, headers):
+        if self.token is None:
+            return True
+        scheme, _, given = headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(given.strip().encode(), self.token.encode())
+
+    # --- HANDLERS ---
+    # Each returns (status, JSON payload)
+    def student_json(self, row):
+        name, s_id, attendance, q, m, f = row[:6]
+        record = {"student_id": s_id, "full_name": name, "attendance": attendance,
+                  "quiz": q, "midterm": m, "final": f, "gpa": round(self.math.calculate_weighted_gpa(q, m, f), 2)}
+        if hasattr(row, "course"):
+            record.update(course=row.course, year_level=row.year_level, section=row.section)
+        return record
+
+    def health(self, query, payload):
+        return HTTPStatus.OK, {"status": "ok", "data_version": self.db.data_version}
+
+    def search(self, query, payload):
+        try:
+            limit = int(query.get("limit", SEARCH_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"limit must be between 1 and {MAX_SEARCH_LIMIT}.")
+        rows = self.db.search_students(query.get("q", ""), limit=limit)
+        return HTTPStatus.OK, {"students": [self.student_json(row) for row in rows]}
+
+    def get_student(self, query, payload, student_id):
+        record = self.db.get_student(student_id)
+        if record is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Student {student_id} not found.")
+        return HTTPStatus.OK, self.student_json(record)
+
+    def create_student(self, query, payload):
+        s_id = str(payload.get("student_id", "")).strip()
+        if not STUDENT_ID_PATTERN.match(s_id):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "student_id must follow format XX-XXXX.")
+        name, scores = self.parse_record(payload)
+        course, year, section = self.parse_segment({"course": "BSIT", "year_level": 1, "section": "", **payload})
+        success, msg = self.db.add_student_record(s_id, name, course, year, *scores, section)
+        if not success:
+            raise ApiError(HTTPStatus.CONFLICT if "already exists" in msg else HTTPStatus.BAD_REQUEST, msg)
+        return HTTPStatus.CREATED, self.student_json(self.db.get_student(s_id))
+
+    def update_student(self, query, payload, student_id):
+        name, scores = self.parse_record(payload)
+        success, outcome = self.db.update_records([(student_id, name, *scores, *self.parse_segment(payload))])
+        if not success:
+            raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, outcome)
+        if outcome[student_id] == "not found":
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Student {student_id} not found.")
+        return HTTPStatus.OK, self.student_json(self.db.get_student(student_id))
+
+    def delete_student(self, query, payload, student_id):
+        success, outcome = self.db.delete_records([student_id])
+        if not success:
+            raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, outcome)
+        if outcome[student_id] == "not found":
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Student {student_id} not found.")
+        return HTTPStatus.OK, {"deleted": student_id}
+
+    async def summary(self, query, payload):
+        return HTTPStatus.OK, await self.cached("summary", self.db.get_summary_stats)
+
+    async def honors(self, query, payload):
+        return HTTPStatus.OK, await self.cached("honors", self.honors_json)
+
+    async def at_risk(self, query, payload):
+        return HTTPStatus.OK, await self.cached("at-risk", self.at_risk_json)
+
+    def honors_json(self):
+        honors, _ = self.db.fetch_flagged_students()
+        return {"students": [{"full_name": name, "student_id": s_id, "gpa": round(gpa, 2)}
+                             for name, s_id, gpa in honors]}
+
+    def at_risk_json(self):
+        _, at_risk = self.db.fetch_flagged_students()
+        return {"students": [{"full_name": name, "student_id": s_id, "attendance": attendance,
+                              "gpa": round(gpa, 2), "risk": self.math.risk_label(mask)}
+                             for name, s_id, attendance, gpa, mask in at_risk]}
+
+    async def cached(self, key, compute):
+        # Runs on the event loop. At most one computation per key is on the reader pool at a time; requests
+        # that arrive meanwhile wait for it without holding a thread, then check the version again.
+        loop = asyncio.get_running_loop()
+        while True:
+            # poll_changes queries SQLite and may run change listeners, so it stays off the event loop
+            version = await loop.run_in_executor(self._readers, self.db.poll_changes)
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] >= version:
+                return entry[1]
+            running = self._computing.get(key)
+            if running is None:
+                break
+            await asyncio.wait([running])
+        # The version is read before computing, so a write that lands meanwhile only causes a recompute
+        running = self._computing[key] = loop.run_in_executor(self._readers, compute)
+        try:
+            result = await asyncio.shield(running)
+        finally:
+            if self._computing.get(key) is running: del self._computing[key]
+        self._cache[key] = (version, result)
+        return result
+
+    def parse_record(self, payload):
+        # (full_name, [attendance, quiz, midterm, final]) with the same checks as the record form
+        name = str(payload.get("full_name", "")).strip()
+        if not name:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "full_name is required.")
+        try:
+            scores = [float(payload[key]) for key in ("attendance", "quiz", "midterm", "final")]
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "attendance, quiz, midterm and final must be numbers.")
+        if not _scores_in_range(scores):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Scores must be 0-100.")
+        return name, scores
+
+    def parse_segment(self, payload):
+        # (course, year_level, section) with the same checks as the record form; absent keys give None,
+        # which update_records reads as "leave unchanged"
+        course, year, section = (payload.get(key) for key in ("course", "year_level", "section"))
+        if course is not None:
+            course = str(course).strip().upper()
+            if not course:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "course must not be empty.")
+        if year is not None:
+            try:
+                year = int(year)
+            except (TypeError, ValueError):
+                year = 0
+            if not 1 <= year <= 6:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "year_level must be 1-6.")
+        if section is not None:
+            section = str(section).strip().upper()
+        return course, year, section
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def run_server(db_path, config, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=DEFAULT_READERS, ready=None):
+    # Blocks until interrupted (Ctrl+C). Raises ValueError for a non-loopback host without an API token.
+    token = config.get("api", {}).get("token")
+    if not token and not is_loopback(host):
+        raise ValueError(f"Refusing to serve on {host} without an API token: set \"api\": {{\"token\": ...}} "
+                         "in settings.json, or use a loopback address.")
+    with DataEngine(db_path, config['grading_weights'], config.get('thresholds')) as db:
+        math_eng = AnalyticsEngine(config['grading_weights'], config.get('thresholds'))
+        db.add_change_listener(math_eng.on_data_change)
+        server = ApiServer(db, math_eng, readers, token)
+        try:
+            asyncio.run(server.serve(host, port, ready))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
@@ -0,0 +1,164 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.api_server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_READERS, run_server
+from src.data_engine import DataEngine
+from src.math_core import AnalyticsEngine
+
+# Headless entry point: `python main.py <command> ...`. Only the engines are imported, never Tk or Matplotlib.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'settings.json')
+DB_PATH = os.path.join(BASE_DIR, 'database', 'academic_data.db')
+EXPORT_DIR = os.path.join(BASE_DIR, 'exports')
+SEGMENT_LEVELS = ("course", "year_level", "section")
+
+
+# --- COMMANDS ---
+# Each takes (db, math_engine, args) and returns a list of flat dict rows
+def summary_rows(db, math_eng, args):
+    return [db.get_summary_stats()]
+
+
+def honors_rows(db, math_eng, args):
+    honors, _ = db.fetch_flagged_students()
+    return [{"name": name, "student_id": s_id, "gpa": round(gpa, 2)} for name, s_id, gpa in honors]
+
+
+def at_risk_rows(db, math_eng, args):
+    _, at_risk = db.fetch_flagged_students()
+    return [{"name": name, "student_id": s_id, "attendance": attendance, "gpa": round(gpa, 2),
+             "risk": math_eng.risk_label(mask)} for name, s_id, attendance, gpa, mask in at_risk]
+
+
+def regression_rows(db, math_eng, args):
+    row = {"students": db.count_records()}
+    try:
+        stats = math_eng.attendance_trend(db)
+    except ValueError as e:
+        return [{**row, "error": str(e)}]
+    if stats is None:
+        return [{**row, "error": "Need at least 2 students."}]
+    return [{**row, **stats, "insight": math_eng.generate_insight_text(stats['correlation']).replace("\n", " ")}]
+
+
+def segment_rows(db, math_eng, args):
+    segments = math_eng.summarize_segments(db.get_segment_stats(SEGMENT_LEVELS[:args.depth]))
+    return [{**entry["segment"], "students": entry["count"], "avg_gpa": entry["avg_gpa"],
+             "pass_rate": entry["pass_rate"], "avg_attendance": entry["avg_attendance"],
+             "correlation": entry["correlation"], "histogram": " ".join(map(str, entry["histogram"]))}
+            for entry in segments]
+
+
+def export_rows(db, math_eng, args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(db.db_path))[0]
+    filename = os.path.join(args.output_dir, f"{name}_Student_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    written = db.export_csv(filename, math_eng)
+    return [{"file": filename, "rows": written}]
+
+
+COMMANDS = {
+    "summary": (summary_rows, "Class totals, averages and pass rate"),
+    "honors": (honors_rows, "Students at or above the honors GPA"),
+    "at-risk": (at_risk_rows, "Students with low attendance or failing grades"),
+    "regression": (regression_rows, "Attendance -> GPA trend line"),
+    "segments": (segment_rows, "Per course / year level / section statistics"),
+    "export": (export_rows, "Full student report as CSV, one file per database"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="EduMatrix headless reports.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, (_, help_text) in COMMANDS.items():
+        cmd = sub.add_parser(command, help=help_text)
+        cmd.add_argument("--db", action="append", dest="databases", metavar="PATH",
+                         help="database to report on; repeat for several (default: the app database)")
+        cmd.add_argument("--config", default=CONFIG_PATH, help="settings.json with grading weights and thresholds")
+        cmd.add_argument("--jobs", type=int, default=1, help="databases processed in parallel")
+        if command != "export":
+            cmd.add_argument("--format", choices=("json", "csv"), default="json")
+            cmd.add_argument("--output", help="write to this file instead of stdout")
+        else:
+            cmd.add_argument("--output-dir", default=EXPORT_DIR)
+        if command == "segments":
+            cmd.add_argument("--depth", type=int, choices=(1, 2, 3), default=3,
+                             help="group by course (1), + year level (2), + section (3)")
+
+    # Long-running, so it is not one of the batch COMMANDS
+    serve = sub.add_parser("serve", help="Local HTTP/JSON API over one database")
+    serve.add_argument("--db", default=DB_PATH, metavar="PATH")
+    serve.add_argument("--config", default=CONFIG_PATH, help="settings.json with grading weights and thresholds")
+    serve.add_argument("--host", default=DEFAULT_HOST,
+                       help="non-loopback addresses need an api token in settings.json")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--readers", type=int, default=DEFAULT_READERS, help="threads serving read requests")
+    return parser
+
+
+def run_database(path, config, command, args):
+    # One database, one engine pair; errors are reported per database instead of aborting the batch
+    if not os.path.exists(path):
+        return {"database": path, "error": "Database file not found."}
+    try:
+        with DataEngine(path, config['grading_weights'], config.get('thresholds')) as db:
+            math_eng = AnalyticsEngine(config['grading_weights'], config.get('thresholds'))
+            return {"database": path, "rows": COMMANDS[command][0](db, math_eng, args)}
+    except Exception as e:
+        return {"database": path, "error": str(e)}
+
+
+def write_csv(results, file):
+    rows = [{"database": result["database"], **row} for result in results for row in result.get("rows", [])]
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    writer = csv.DictWriter(file, fieldnames=fields or ["database"])
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with open(args.config) as f:
+        config = json.load(f)
+
+    if args.command == "serve":
+        if not os.path.exists(args.db):
+            print(f"{args.db}: Database file not found.", file=sys.stderr)
+            return 1
+        try:
+            run_server(args.db, config, args.host, args.port, max(1, args.readers),
+                       ready=lambda address: print(f"Serving {args.db} on http://{address[0]}:{address[1]}/api",
+                                                   flush=True))
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    databases = args.databases or [DB_PATH]
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = list(pool.map(lambda path: run_database(path, config, args.command, args), databases))
+
+    failed = [result for result in results if "error" in result]
+    for result in failed:
+        print(f"{result['database']}: {result['error']}", file=sys.stderr)
+
+    output = getattr(args, "output", None)
+    file = open(output, "w", newline="") if output else sys.stdout
+    try:
+        if getattr(args, "format", "json") == "csv":
+            write_csv(results, file)
+        else:
+            json.dump({"command": args.command, "results": results}, file, indent=2, default=str)
+            file.write("\n")
+    finally:
+        if output: file.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,119 +1,1006 @@
 import sqlite3
 import os
+import csv
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict, namedtuple
+
+import numpy as np
+
+from src.math_core import DEFAULT_THRESHOLDS
+from src.profiler import ProfiledConnection, profiled
+
+# Applied once to every pooled connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+STATEMENT_CACHE_SIZE = 128
+
+STUDENT_ID_PATTERN = re.compile(r"^\d{2}-\d{4}$")
+
+# Header names written by the CSV export, which the importer reads back
+IMPORT_COLUMNS = {
+    "name": "Full Name",
+    "student_id": "Student ID",
+    "attendance": "Attendance %",
+    "quiz": "Quiz",
+    "midterm": "Midterm",
+    "final": "Finals",
+}
+IMPORT_BATCH_SIZE = 5000
+# Per-row triggers that import batches replace with one INSERT ... SELECT each
+IMPORT_BULK_TRIGGERS = ("students_fts_insert", "grade_history_insert")
+
+# Index N holds the script that upgrades a database from user_version N to N + 1
+SCHEMA_MIGRATIONS = [
+    # v1: original schema
+    """
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT UNIQUE NOT NULL,
+        full_name TEXT NOT NULL,
+        course TEXT,
+        year_level INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS grades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_foreign_id TEXT,
+        attendance_rate REAL,
+        quiz_score REAL,
+        midterm_score REAL,
+        final_score REAL,
+        FOREIGN KEY(student_foreign_id) REFERENCES students(student_id)
+    );
+    """,
+    # v2: one indexed grades row per student, removed together with the student
+    """
+    CREATE TABLE grades_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_foreign_id TEXT NOT NULL UNIQUE,
+        attendance_rate REAL,
+        quiz_score REAL,
+        midterm_score REAL,
+        final_score REAL,
+        FOREIGN KEY(student_foreign_id) REFERENCES students(student_id) ON UPDATE CASCADE ON DELETE CASCADE
+    );
+    INSERT INTO grades_v2 (id, student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score)
+        SELECT id, student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score
+        FROM grades
+        WHERE id IN (SELECT MAX(id) FROM grades GROUP BY student_foreign_id)
+          AND student_foreign_id IN (SELECT student_id FROM students);
+    DROP TABLE grades;
+    ALTER TABLE grades_v2 RENAME TO grades;
+    """,
+    # v3: full-text index over names and IDs, kept in sync by triggers
+    """
+    CREATE VIRTUAL TABLE students_fts USING fts5(
+        student_id, full_name,
+        content='students', content_rowid='id',
+        tokenize="unicode61 tokenchars '-'", prefix='2 3'
+    );
+    CREATE TRIGGER students_fts_insert AFTER INSERT ON students BEGIN
+        INSERT INTO students_fts (rowid, student_id, full_name) VALUES (new.id, new.student_id, new.full_name);
+    END;
+    CREATE TRIGGER students_fts_delete AFTER DELETE ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, student_id, full_name)
+            VALUES ('delete', old.id, old.student_id, old.full_name);
+    END;
+    CREATE TRIGGER students_fts_update AFTER UPDATE OF student_id, full_name ON students BEGIN
+        INSERT INTO students_fts (students_fts, rowid, student_id, full_name)
+            VALUES ('delete', old.id, old.student_id, old.full_name);
+        INSERT INTO students_fts (rowid, student_id, full_name) VALUES (new.id, new.student_id, new.full_name);
+    END;
+    INSERT INTO students_fts (students_fts) VALUES ('rebuild');
+    """,
+    # v4: ordered paging by name
+    """
+    CREATE INDEX IF NOT EXISTS idx_students_name ON students(full_name);
+    """,
+    # v5: ordered paging by attendance (the GPA index depends on weights, see set_grading_weights)
+    """
+    CREATE INDEX IF NOT EXISTS idx_grades_attendance ON grades(attendance_rate);
+    """,
+    # v6: class sections, and one index over every segment level for filtered analytics
+    """
+    ALTER TABLE students ADD COLUMN section TEXT NOT NULL DEFAULT '';
+    CREATE INDEX IF NOT EXISTS idx_students_segment ON students(course, year_level, section);
+    """,
+    # v7: academic terms and an append-only grade history. grades keeps serving the current term;
+    # every write to it is copied into grade_history, keyed by (students.id, term, revision) without a rowid
+    """
+    CREATE TABLE terms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        started_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        is_current INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE UNIQUE INDEX idx_terms_current ON terms(is_current) WHERE is_current = 1;
+    CREATE TABLE grade_history (
+        student_id INTEGER NOT NULL,
+        term_id INTEGER NOT NULL REFERENCES terms(id),
+        revision INTEGER NOT NULL,
+        attendance_rate REAL,
+        quiz_score REAL,
+        midterm_score REAL,
+        final_score REAL,
+        recorded_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (student_id, term_id, revision)
+    ) WITHOUT ROWID;
+    CREATE TRIGGER grade_history_insert AFTER INSERT ON grades BEGIN
+        INSERT INTO grade_history (student_id, term_id, revision, attendance_rate, quiz_score, midterm_score, final_score)
+            SELECT s.id, t.id,
+                   COALESCE((SELECT MAX(h.revision) + 1 FROM grade_history h WHERE h.student_id = s.id AND h.term_id = t.id), 0),
+                   new.attendance_rate, new.quiz_score, new.midterm_score, new.final_score
+            FROM students s, terms t
+            WHERE s.student_id = new.student_foreign_id AND t.is_current = 1;
+    END;
+    CREATE TRIGGER grade_history_update AFTER UPDATE OF attendance_rate, quiz_score, midterm_score, final_score ON grades BEGIN
+        INSERT INTO grade_history (student_id, term_id, revision, attendance_rate, quiz_score, midterm_score, final_score)
+            SELECT s.id, t.id,
+                   COALESCE((SELECT MAX(h.revision) + 1 FROM grade_history h WHERE h.student_id = s.id AND h.term_id = t.id), 0),
+                   new.attendance_rate, new.quiz_score, new.midterm_score, new.final_score
+            FROM students s, terms t
+            WHERE s.student_id = new.student_foreign_id AND t.is_current = 1;
+    END;
+    CREATE TRIGGER grade_history_no_update BEFORE UPDATE ON grade_history BEGIN
+        SELECT RAISE(ABORT, 'grade_history is append-only');
+    END;
+    CREATE TRIGGER grade_history_no_delete BEFORE DELETE ON grade_history BEGIN
+        SELECT RAISE(ABORT, 'grade_history is append-only');
+    END;
+    INSERT INTO terms (name, is_current) VALUES ('Initial Term', 1);
+    INSERT INTO grade_history (student_id, term_id, revision, attendance_rate, quiz_score, midterm_score, final_score)
+        SELECT s.id, (SELECT id FROM terms WHERE is_current = 1), 0,
+               g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score
+        FROM students s
+        JOIN grades g ON s.student_id = g.student_foreign_id;
+    """,
+    # v8: a counter every DataEngine write transaction bumps. It lets an engine notice commits made by other
+    # engines (another app instance, the API server). PRAGMA data_version cannot: it is per connection, moves on
+    # this engine's own pooled connections too, and does not count commits.
+    """
+    CREATE TABLE write_stamp (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        stamp INTEGER NOT NULL
+    );
+    INSERT INTO write_stamp (id, stamp) VALUES (1, 0);
+    """,
+    # v9: the FTS index splits words at hyphens again, so the serial of an ID ("3316" of 23-3316) and each half
+    # of a hyphenated surname are words of their own. The triggers only name the table, so they keep working.
+    """
+    DROP TABLE students_fts;
+    CREATE VIRTUAL TABLE students_fts USING fts5(
+        student_id, full_name,
+        content='students', content_rowid='id',
+        tokenize='unicode61', prefix='2 3'
+    );
+    INSERT INTO students_fts (students_fts) VALUES ('rebuild');
+    """,
+]
+
+# Sort key -> (ORDER BY expression, unique tie-breaker) for keyset pagination;
+# "gpa" is resolved per engine since it depends on the grading weights
+SORT_COLUMNS = {
+    "name": ("s.full_name", "s.id"),
+    "student_id": ("s.student_id", "s.id"),
+    "attendance": ("g.attendance_rate", "g.id"),
+    "gpa": None,
+}
+PAGE_SIZE = 200
+
+# Typed row for point lookups. RECORD_QUERY is also the row source of fetch_analytics_data,
+# iter_analytics_data and the CSV export, so every one of them shares this column order.
+StudentRecord = namedtuple("StudentRecord", [
+    "full_name", "student_id", "attendance_rate", "quiz_score", "midterm_score", "final_score",
+    "course", "year_level", "section",
+])
+RECORD_QUERY = """
+    SELECT s.full_name, s.student_id, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score,
+           s.course, s.year_level, s.section
+    FROM students s
+    JOIN grades g ON s.student_id = g.student_foreign_id
+"""
+# (full_name, course, year_level, section, student_id); a NULL segment value keeps the current one
+STUDENT_UPDATE = """
+    UPDATE students SET full_name = ?, course = COALESCE(?, course), year_level = COALESCE(?, year_level),
+                        section = COALESCE(?, section)
+    WHERE student_id = ?
+"""
+
+# Keys of get_snapshot(), in fetch_analytics_data column order plus the weighted GPA
+SNAPSHOT_COLUMNS = ("names", "ids", "attendance", "quiz", "midterm", "final", "gpa")
+
+EXPORT_COLUMNS = ["Full Name", "Student ID", "Attendance %", "Quiz", "Midterm", "Finals",
+                  "Course", "Year Level", "Section"]
+EXPORT_CHUNK_SIZE = 5000
+
+DEFAULT_WEIGHTS = {"quiz": 0.2, "midterm": 0.4, "final": 0.4}
+# Names and IDs split the same way the FTS tokenizer splits them
+SEARCH_TOKEN = re.compile(r"[^\W_]+")
+# Words of a search box query; a hyphenated word such as "23-33" or "santos-reyes" is searched as a phrase
+SEARCH_WORD = re.compile(r"[^\W_]+(?:-[^\W_]+)*")
+# Recent search_students results kept per data version; larger results are not cached
+SEARCH_CACHE_SIZE = 64
+SEARCH_CACHE_MAX_ROWS = 1000
+
+# Segment level -> students column, in grouping order
+SEGMENT_COLUMNS = {"course": "s.course", "year_level": "s.year_level", "section": "s.section"}
+# GPA histogram buckets per segment: 0-9, 10-19, ... 90-100
+GPA_BUCKETS = 10
+
+# Keys of fetch_grade_history(): one entry per (student, term), holding the term's latest revision
+HISTORY_COLUMNS = ("student_keys", "student_ids", "term_ids", "attendance", "quiz", "midterm", "final")
+Term = namedtuple("Term", ["id", "name", "started_at", "is_current"])
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+MAX_SQL_PARAMS = 500
+
+
+def _chunks(items, size=MAX_SQL_PARAMS):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _scores_in_range(scores):
+    return all(0 <= value <= 100 for value in scores)
+
+
+def _segment_valid(course, year):
+    # Same rules as the record form; None means the value is not being changed
+    return (course is None or bool(course)) and (year is None or 1 <= year <= 6)
+
+
+def _fold(text):
+    # Lower case without accents, like the unicode61 tokenizer, so cached rows can be matched in Python
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _search_words(text):
+    # Query words as tuples of tokens, e.g. "23-33 cruz" -> (("23", "33"), ("cruz",))
+    return tuple(tuple(word.split("-")) for word in SEARCH_WORD.findall(_fold(text)))
+
+
+def _row_words(row):
+    # One token sequence per row; the "" between name and ID stops a phrase from matching across the two
+    return (tuple(SEARCH_TOKEN.findall(_fold(row[0])) + [""] + SEARCH_TOKEN.findall(_fold(row[1]))),)
+
+
+def _phrase_in(phrase, tokens):
+    # FTS phrase prefix match: consecutive tokens equal to the phrase, the last one only needs to start with it
+    size = len(phrase)
+    return any(tokens[i:i + size - 1] == phrase[:-1] and tokens[i + size - 1].startswith(phrase[-1])
+               for i in range(len(tokens) - size + 1))
+
+
+def _extends(words, cached_words):
+    # Every row matching `words` also matched `cached_words`: each cached phrase occurs within a new word
+    return all(any(_phrase_in(cached, word) for word in words) for cached in cached_words)
 
 
 class DataEngine:
-    def __init__(self, db_path):
+    def __init__(self, db_path, weights=None, thresholds=None):
         self.db_path = db_path
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        # One long-lived connection per thread, closed together in close()
+        self._local = threading.local()
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        # Bumped by every write; the columnar snapshot is rebuilt when it falls behind
+        self._data_version = 0
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._listeners = []
+        # Last write_stamp accounted for; a higher stamp in the database means another engine wrote
+        self._stamp = 0
+        self._stamp_lock = threading.Lock()
+        # (tokens, limit) -> search result, most recently used last; emptied when the data version moves on
+        self._search_cache = OrderedDict()
+        self._search_version = None
+        self._search_lock = threading.Lock()
         self.init_database()
+        self._stamp = self._read_stamp(self._connect())
+        self.set_grading_weights(weights or DEFAULT_WEIGHTS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def set_grading_weights(self, weights):
+        self.weights = (weights['quiz'], weights['midterm'], weights['final'])
+        self.gpa_sql = self._gpa_expression("g.")
+        self._ensure_gpa_index()
+        self._mark_changed()
+
+    @property
+    def data_version(self):
+        return self._data_version
+
+    def add_change_listener(self, listener):
+        # listener(version, removed, added) runs after every committed write. removed / added are lists of
+        # (attendance, quiz, midterm, final) rows, or both None when the change is not a row delta.
+        self._listeners.append(listener)
+
+    def _mark_changed(self, removed=None, added=None, stamp=None):
+        # stamp is the write_stamp claimed by the commit being reported
+        if stamp is not None:
+            with self._stamp_lock:
+                # A gap means another engine committed in between, so the row deltas alone are incomplete
+                if stamp != self._stamp + 1:
+                    removed = added = None
+                self._stamp = max(self._stamp, stamp)
+        self._data_version += 1
+        for listener in self._listeners:
+            listener(self._data_version, removed, added)
+
+    def _read_stamp(self, conn):
+        return conn.execute("SELECT stamp FROM write_stamp").fetchone()[0]
+
+    def _claim_stamp(self, conn):
+        # Inside a write transaction, after its first write, so the write lock is held and the value is current
+        conn.execute("UPDATE write_stamp SET stamp = stamp + 1")
+        return self._read_stamp(conn)
+
+    def poll_changes(self):
+        # Picks up commits made through other engines; every cache keyed on data_version calls this first
+        stamp = self._read_stamp(self._connect())
+        with self._stamp_lock:
+            if stamp <= self._stamp:
+                return self._data_version
+            self._stamp = stamp
+        self._mark_changed()
+        return self._data_version
+
+    def _gpa_expression(self, prefix=""):
+        # Weights are inlined as literals so the expression can match idx_grades_gpa
+        w_q, w_m, w_f = (repr(float(w)) for w in self.weights)
+        return f"({prefix}quiz_score * {w_q} + {prefix}midterm_score * {w_m} + {prefix}final_score * {w_f})"
+
+    def _ensure_gpa_index(self):
+        definition = f"CREATE INDEX idx_grades_gpa ON grades{self._gpa_expression()}"
+        conn = self._connect()
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name='idx_grades_gpa'").fetchone()
+        if row and row[0] == definition:
+            return
+        with conn:
+            conn.execute("DROP INDEX IF EXISTS idx_grades_gpa")
+            conn.execute(definition)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+                                   factory=ProfiledConnection)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._pool_lock:
+                self._pool.append(conn)
+        return conn
+
+    def close(self):
+        with self._pool_lock:
+            for conn in self._pool:
+                conn.close()
+            self._pool.clear()
+            self._local = threading.local()
 
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT UNIQUE NOT NULL,
-                full_name TEXT NOT NULL,
-                course TEXT,
-                year_level INTEGER
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS grades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_foreign_id TEXT,
-                attendance_rate REAL,
-                quiz_score REAL,
-                midterm_score REAL,
-                final_score REAL,
-                FOREIGN KEY(student_foreign_id) REFERENCES students(student_id)
-            )
-        """)
-        conn.commit()
-        conn.close()
+        # Upgrade in place, one PRAGMA user_version step at a time
+        conn = self._connect()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(SCHEMA_MIGRATIONS):
+            return
 
-    def add_student_record(self, s_id, name, course, year, attendance, q, m, f):
+        # Table rebuilds need foreign keys off; the setting is ignored inside a transaction
+        conn.execute("PRAGMA foreign_keys=OFF")
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO students (student_id, full_name, course, year_level) VALUES (?, ?, ?, ?)",
-                           (s_id, name, course, year))
-            cursor.execute(
-                "INSERT INTO grades (student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score) VALUES (?, ?, ?, ?, ?)",
-                (s_id, attendance, q, m, f))
-            conn.commit()
+            for target in range(version + 1, len(SCHEMA_MIGRATIONS) + 1):
+                conn.executescript(
+                    f"BEGIN;\n{SCHEMA_MIGRATIONS[target - 1]}\nPRAGMA user_version = {target};\nCOMMIT;")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+
+    @profiled
+    def add_student_record(self, s_id, name, course, year, attendance, q, m, f, section=""):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO students (student_id, full_name, course, year_level, section) VALUES (?, ?, ?, ?, ?)",
+                    (s_id, name, course, year, section))
+                conn.execute(
+                    "INSERT INTO grades (student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score) VALUES (?, ?, ?, ?, ?)",
+                    (s_id, attendance, q, m, f))
+                stamp = self._claim_stamp(conn)
+            self._mark_changed([], [(attendance, q, m, f)], stamp)
             return True, "Record Created Successfully"
         except sqlite3.IntegrityError:
             return False, "Error: Student ID already exists."
         except Exception as e:
             return False, str(e)
-        finally:
-            conn.close()
 
     # NEW: UPDATE FUNCTION
-    def update_student_record(self, s_id, name, attendance, q, m, f):
+    @profiled
+    def update_student_record(self, s_id, name, attendance, q, m, f, course=None, year=None, section=None):
+        # course / year / section left as None keep their current values
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Update Profile
-            cursor.execute("UPDATE students SET full_name=? WHERE student_id=?", (name, s_id))
-            # Update Grades
-            cursor.execute(
-                "UPDATE grades SET attendance_rate=?, quiz_score=?, midterm_score=?, final_score=? WHERE student_foreign_id=?",
-                (attendance, q, m, f, s_id))
-            conn.commit()
+            with self._connect() as conn:
+                old = self._scores_by_id(conn, [s_id])
+                # Update Profile
+                conn.execute(STUDENT_UPDATE, (name, course, year, section, s_id))
+                # Update Grades
+                conn.execute(
+                    "UPDATE grades SET attendance_rate=?, quiz_score=?, midterm_score=?, final_score=? WHERE student_foreign_id=?",
+                    (attendance, q, m, f, s_id))
+                stamp = self._claim_stamp(conn)
+            self._mark_changed(list(old.values()), [(attendance, q, m, f)] if old else [], stamp)
             return True, "Record Updated Successfully"
         except Exception as e:
             return False, str(e)
-        finally:
-            conn.close()
 
+    @profiled
     def fetch_analytics_data(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        query = """
-            SELECT s.full_name, s.student_id, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score
+        return self._connect().execute(RECORD_QUERY).fetchall()
+
+    # --- POINT LOOKUPS ---
+    @profiled
+    def get_student(self, student_id):
+        row = self._connect().execute(RECORD_QUERY + " WHERE s.student_id = ?", (student_id,)).fetchone()
+        return StudentRecord._make(row) if row else None
+
+    @profiled
+    def get_students(self, student_ids):
+        # {student_id: StudentRecord}; unknown IDs are simply absent
+        records = {}
+        conn = self._connect()
+        for chunk in _chunks(list(student_ids)):
+            placeholders = ",".join("?" * len(chunk))
+            for row in conn.execute(RECORD_QUERY + f" WHERE s.student_id IN ({placeholders})", chunk):
+                records[row[1]] = StudentRecord._make(row)
+        return records
+
+    @profiled
+    def get_snapshot(self):
+        # Columnar, read-only copy of the analytics dataset shared by every tab until the next write.
+        # Polled before taking the lock: poll_changes may run change listeners, which take their own locks.
+        version = self.poll_changes()
+        with self._snapshot_lock:
+            if self._snapshot is not None and self._snapshot["version"] == version:
+                return self._snapshot
+
+            query = f"""
+                SELECT s.full_name, s.student_id, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score,
+                       {self.gpa_sql}
+                FROM students s
+                JOIN grades g ON s.student_id = g.student_foreign_id
+            """
+            rows = self._connect().execute(query).fetchall()
+            columns = list(zip(*rows)) if rows else [()] * 7
+            snapshot = {"version": version}
+            for key, values in zip(SNAPSHOT_COLUMNS, columns):
+                array = np.array(values, dtype=object if key in ("names", "ids") else float)
+                array.flags.writeable = False
+                snapshot[key] = array
+            self._snapshot = snapshot
+            return snapshot
+
+    def iter_analytics_data(self, chunk_size=EXPORT_CHUNK_SIZE):
+        # Same rows as fetch_analytics_data, in fetchmany chunks so memory stays bounded
+        cursor = self._connect().execute(RECORD_QUERY)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows: break
+                yield rows
+        finally:
+            cursor.close()
+
+    def count_records(self):
+        query = "SELECT COUNT(*) FROM students s JOIN grades g ON s.student_id = g.student_foreign_id"
+        return self._connect().execute(query).fetchone()[0]
+
+    @profiled
+    def export_csv(self, filename, math_engine=None, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+        # math_engine adds its computed columns (GPA, pass/fail, risk) chunk by chunk
+        total = self.count_records() if progress else 0
+        header = EXPORT_COLUMNS + (list(math_engine.EXPORT_COLUMNS) if math_engine else [])
+        written = 0
+        # utf-8-sig like import_csv reads, so exports round-trip on Windows and open correctly in Excel
+        with open(filename, mode='w', newline='', encoding='utf-8-sig') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for rows in self.iter_analytics_data(chunk_size):
+                if math_engine:
+                    rows = [row + extra for row, extra in zip(rows, math_engine.export_columns(rows))]
+                writer.writerows(rows)
+                written += len(rows)
+                if progress and total:
+                    progress(written / total)
+        return written
+
+    @profiled
+    def fetch_page(self, sort_by="name", after=None, limit=PAGE_SIZE, descending=False, before=None, keys=False):
+        # Keyset pagination: `after` is the cursor returned with the previous page. `before` pages backwards
+        # instead: the rows just ahead of that key, still in display order, with the cursor on the first row.
+        # keys=True keeps each row's (sort value, tie-breaker) key at row[6:].
+        column, tiebreak = SORT_COLUMNS[sort_by] or (self.gpa_sql, "g.id")
+        backward = before is not None
+        # A backward page is read in the opposite order and flipped
+        direction = "DESC" if descending != backward else "ASC"
+        bound = before if backward else after
+        where = ""
+        params = []
+        if bound is not None:
+            # Spelled out instead of a row-value comparison so expression indexes give a range scan
+            op = "<" if direction == "DESC" else ">"
+            where = f"WHERE {column} {op}= ? AND ({column} {op} ? OR {tiebreak} {op} ?)"
+            params.extend((bound[0], bound[0], bound[1]))
+
+        query = f"""
+            SELECT s.full_name, s.student_id, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score,
+                   {column}, {tiebreak}
             FROM students s
             JOIN grades g ON s.student_id = g.student_foreign_id
+            {where}
+            ORDER BY {column} {direction}, {tiebreak} {direction}
+            LIMIT ?
         """
-        cursor.execute(query)
-        data = cursor.fetchall()
-        conn.close()
-        return data
-
-    def search_students(self, query_text):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        rows = self._connect().execute(query, (*params, limit)).fetchall()
+        if backward: rows.reverse()
+        cursor = (rows[0] if backward else rows[-1])[6:] if len(rows) == limit else None
+        return (rows if keys else [row[:6] for row in rows]), cursor
+
+    @profiled
+    def search_students(self, query_text, limit=None):
+        # Every word is a prefix match against the FTS index; best matches first
+        tokens = SEARCH_WORD.findall(query_text.lower())
+        limit = -1 if limit is None else limit
+        if tokens:
+            # poll_changes also moves the version on for writes made through other engines
+            version = self.poll_changes()
+            folded = _search_words(query_text)
+            rows = self._cached_search(folded, limit, version)
+            if rows is None:
+                rows = self._query_search(tokens, limit)
+                self._cache_search(folded, limit, version, rows)
+            return list(rows)
+        return self._query_search(tokens, limit)
+
+    def _query_search(self, tokens, limit):
+        if not tokens:
+            query = """
+                SELECT s.full_name, s.student_id, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score
+                FROM students s
+                JOIN grades g ON s.student_id = g.student_foreign_id
+                LIMIT ?
+            """
+            return self._connect().execute(query, (limit,)).fetchall()
+
         query = """
             SELECT s.full_name, s.student_id, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score
-            FROM students s
+            FROM students_fts f
+            JOIN students s ON s.id = f.rowid
             JOIN grades g ON s.student_id = g.student_foreign_id
-            WHERE s.full_name LIKE ? OR s.student_id LIKE ?
+            WHERE students_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
         """
-        cursor.execute(query, (f'%{query_text}%', f'%{query_text}%'))
-        data = cursor.fetchall()
-        conn.close()
-        return data
+        match = " ".join('"{}"*'.format(token.replace("-", " ")) for token in tokens)
+        return self._connect().execute(query, (match, limit)).fetchall()
+
+    def _cached_search(self, tokens, limit, version):
+        # Cache values are (rows, row_tokens); row_tokens is filled in the first time the rows are filtered
+        with self._search_lock:
+            if self._search_version != version:
+                self._search_cache.clear()
+                self._search_version = version
+                return None
+            key = (version, tokens, limit)
+            entry = self._search_cache.get(key)
+            if entry is not None:
+                self._search_cache.move_to_end(key)
+                return entry[0]
+            # A longer query narrows an earlier one: filter its rows if they were the complete match set
+            base = next((base for base, (rows, _) in reversed(self._search_cache.items())
+                         if base[0] == version and (base[2] < 0 or len(rows) < base[2])
+                         and _extends(tokens, base[1])), None)
+            if base is None:
+                return None
+            rows, row_tokens = self._search_cache[base]
+            if row_tokens is None:
+                row_tokens = [_row_words(row) for row in rows]
+                self._search_cache[base] = (rows, row_tokens)
+            keep = [i for i, words in enumerate(row_tokens) if _extends(words, tokens)]
+            # Past the limit the subset SQLite would rank first is unknown, so ask it instead
+            if 0 <= limit < len(keep):
+                return None
+            rows = [rows[i] for i in keep]
+            self._store_search(key, rows, [row_tokens[i] for i in keep])
+            return rows
+
+    def _cache_search(self, tokens, limit, version, rows):
+        with self._search_lock:
+            # A write may have landed while the query ran; those rows must not outlive it
+            if self._search_version == version == self._data_version:
+                self._store_search((version, tokens, limit), rows)
+
+    def _store_search(self, key, rows, row_tokens=None):
+        if len(rows) > SEARCH_CACHE_MAX_ROWS:
+            return
+        self._search_cache[key] = (rows, row_tokens)
+        self._search_cache.move_to_end(key)
+        while len(self._search_cache) > SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
 
+    @profiled
     def get_summary_stats(self):
-        data = self.fetch_analytics_data()
-        total_students = len(data)
-        if total_students == 0:
-            return {"total": 0, "avg_attendance": 0}
+        # Single aggregate pass; only one row ever leaves SQLite
+        query = """
+            SELECT COUNT(*), AVG(attendance), AVG(gpa),
+                   SUM(gpa >= ?), SUM(gpa >= ?), SUM(gpa < ? OR attendance < ?)
+            FROM (
+                SELECT g.attendance_rate AS attendance,
+                       g.quiz_score * ? + g.midterm_score * ? + g.final_score * ? AS gpa
+                FROM students s
+                JOIN grades g ON s.student_id = g.student_foreign_id
+            )
+        """
+        t = self.thresholds
+        params = (t['passing'], t['honors'], t['passing'], t['min_attendance'], *self.weights)
+        total, avg_att, avg_gpa, passing, honors, at_risk = self._connect().execute(query, params).fetchone()
+        if total == 0:
+            return {"total": 0, "avg_attendance": 0, "avg_gpa": 0, "passing": 0, "pass_rate": 0,
+                    "honors": 0, "at_risk": 0}
 
-        total_att = sum([row[2] for row in data])
         return {
-            "total": total_students,
-            "avg_attendance": round(total_att / total_students, 2)
+            "total": total,
+            "avg_attendance": round(avg_att, 2),
+            "avg_gpa": round(avg_gpa, 2),
+            "passing": passing,
+            "pass_rate": round(passing / total * 100, 1),
+            "honors": honors,
+            "at_risk": at_risk
         }
 
+    # --- TERMS & HISTORY ---
+    def get_terms(self):
+        return [Term._make(row) for row in self._connect().execute(
+            "SELECT id, name, started_at, is_current FROM terms ORDER BY id")]
+
+    def get_current_term(self):
+        row = self._connect().execute("SELECT id, name, started_at, is_current FROM terms WHERE is_current = 1").fetchone()
+        return Term._make(row) if row else None
+
+    def start_term(self, name):
+        # Later grade writes are recorded against the new term. Every student's current grades are copied into
+        # it as revision 0, so students whose grades are never edited still have a row for the term.
+        name = (name or "").strip()
+        if not name:
+            return False, "Term name is required."
+        try:
+            with self._connect() as conn:
+                conn.execute("UPDATE terms SET is_current = 0 WHERE is_current = 1")
+                term_id = conn.execute("INSERT INTO terms (name, is_current) VALUES (?, 1)", (name,)).lastrowid
+                conn.execute("""
+                    INSERT INTO grade_history (student_id, term_id, revision, attendance_rate, quiz_score, midterm_score, final_score)
+                        SELECT s.id, ?, 0, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score
+                        FROM students s
+                        JOIN grades g ON s.student_id = g.student_foreign_id
+                """, (term_id,))
+            return True, f"Term '{name}' started."
+        except sqlite3.IntegrityError:
+            return False, f"Error: Term '{name}' already exists."
+        except Exception as e:
+            return False, str(e)
+
+    @profiled
+    def fetch_grade_history(self, student_ids=None):
+        # Columnar history for AnalyticsEngine, ordered by student then term. student_keys are the stable
+        # students.id values; student_ids are None for students deleted since.
+        # MAX(revision) with bare columns makes SQLite return the rest of that same row.
+        query = """
+            SELECT h.student_id, s.student_id, h.term_id, MAX(h.revision),
+                   h.attendance_rate, h.quiz_score, h.midterm_score, h.final_score
+            FROM grade_history h
+            LEFT JOIN students s ON s.id = h.student_id
+            {where}
+            GROUP BY h.student_id, h.term_id
+            ORDER BY h.student_id, h.term_id
+        """
+        conn = self._connect()
+        if student_ids is None:
+            rows = conn.execute(query.format(where="")).fetchall()
+        else:
+            rows = []
+            for chunk in _chunks(list(student_ids)):
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(conn.execute(query.format(where=f"WHERE s.student_id IN ({placeholders})"), chunk))
+            rows.sort(key=lambda row: (row[0], row[2]))
+
+        columns = list(zip(*rows)) if rows else [()] * 8
+        history = {}
+        for key, values in zip(HISTORY_COLUMNS, columns[:3] + columns[4:]):
+            if key == "student_ids":
+                history[key] = np.array(values, dtype=object)
+            else:
+                history[key] = np.array(values, dtype=np.int64 if key in ("student_keys", "term_ids") else float)
+        return history
+
+    # --- SEGMENTS ---
+    def get_segment_options(self):
+        # Distinct (course, year_level, section) triples for the filter menus, read from idx_students_segment
+        return self._connect().execute(
+            "SELECT DISTINCT course, year_level, section FROM students ORDER BY course, year_level, section").fetchall()
+
+    @profiled
+    def get_segment_stats(self, group_by=tuple(SEGMENT_COLUMNS), course=None, year_level=None, section=None):
+        # One grouped pass over the filtered slice; filters narrow the scan through idx_students_segment.
+        # Per segment: count, passing, sums for the attendance/GPA correlation and a GPA histogram.
+        keys = [SEGMENT_COLUMNS[level] for level in group_by]
+        where, params = [], [self.thresholds['passing']]
+        for column, value in (("s.course", course), ("s.year_level", year_level), ("s.section", section)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+
+        query = f"""
+            SELECT {"".join(key + ", " for key in keys)}MIN(CAST(gpa / 10 AS INTEGER), {GPA_BUCKETS - 1}),
+                   COUNT(*), SUM(gpa >= ?), SUM(attendance), SUM(gpa),
+                   SUM(attendance * gpa), SUM(attendance * attendance), SUM(gpa * gpa)
+            FROM (
+                SELECT {"".join(key + ", " for key in keys)}g.attendance_rate AS attendance, {self.gpa_sql} AS gpa
+                FROM students s
+                JOIN grades g ON s.student_id = g.student_foreign_id
+                {"WHERE " + " AND ".join(where) if where else ""}
+            ) AS s
+            GROUP BY {", ".join(f"{i}" for i in range(1, len(keys) + 2))}
+        """
+        # Bucket rows are folded into one entry per segment, in segment order.
+        # sums are Σattendance, Σgpa, Σattendance·gpa, Σattendance² and Σgpa²
+        segments = {}
+        for row in self._connect().execute(query, params):
+            segment, bucket, (count, passing, *sums) = row[:len(keys)], row[len(keys)], row[len(keys) + 1:]
+            entry = segments.setdefault(segment, {
+                "segment": dict(zip(group_by, segment)), "count": 0, "passing": 0,
+                "sums": [0.0] * 5, "histogram": [0] * GPA_BUCKETS})
+            entry["count"] += count
+            entry["passing"] += passing
+            entry["sums"] = [total + value for total, value in zip(entry["sums"], sums)]
+            entry["histogram"][bucket] = count
+        return [segments[key] for key in sorted(segments, key=lambda k: tuple((v is None, v) for v in k))]
+
+    @profiled
+    def fetch_flagged_students(self):
+        # Same rules as AnalyticsEngine.classify, evaluated in SQL so only flagged rows are transferred.
+        # Returns (honors, at_risk): [(name, id, gpa)] and [(name, id, attendance, gpa, risk bitmask)]
+        query = f"""
+            SELECT name, student_id, attendance, gpa, (attendance < ?) | ((gpa < ?) << 1)
+            FROM (
+                SELECT s.full_name AS name, s.student_id, g.attendance_rate AS attendance, {self.gpa_sql} AS gpa
+                FROM students s
+                JOIN grades g ON s.student_id = g.student_foreign_id
+            )
+            WHERE gpa >= ? OR gpa < ? OR attendance < ?
+            ORDER BY name
+        """
+        t = self.thresholds
+        params = (t['min_attendance'], t['passing'], t['honors'], t['passing'], t['min_attendance'])
+        rows = self._connect().execute(query, params).fetchall()
+        honors = [(name, s_id, gpa) for name, s_id, _, gpa, _ in rows if gpa >= t['honors']]
+        at_risk = [row for row in rows if row[4]]
+        return honors, at_risk
+
+    @profiled
     def delete_record(self, s_id):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM grades WHERE student_foreign_id=?", (s_id,))
-        cursor.execute("DELETE FROM students WHERE student_id=?", (s_id,))
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        # Grades follow through ON DELETE CASCADE
+        with self._connect() as conn:
+            old = self._scores_by_id(conn, [s_id])
+            conn.execute("DELETE FROM students WHERE student_id=?", (s_id,))
+            stamp = self._claim_stamp(conn)
+        self._mark_changed(list(old.values()), [], stamp)
+
+    # --- BATCH WRITES ---
+    @profiled
+    def delete_records(self, student_ids):
+        # One transaction for the whole selection; outcome per ID is "deleted" or "not found"
+        ids = list(dict.fromkeys(student_ids))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                existing = self._existing_ids(conn, ids)
+                old = self._scores_by_id(conn, list(existing))
+                conn.executemany("DELETE FROM students WHERE student_id=?", [(s_id,) for s_id in ids if s_id in existing])
+                stamp = self._claim_stamp(conn) if existing else None
+        except Exception as e:
+            return False, str(e)
+
+        if existing:
+            self._mark_changed(list(old.values()), [], stamp)
+        return True, {s_id: "deleted" if s_id in existing else "not found" for s_id in ids}
+
+    @profiled
+    def update_records(self, rows):
+        # rows are update_student_record arguments: (s_id, name, attendance, q, m, f[, course, year, section]).
+        # Everything is applied in one transaction; outcome per ID is "updated", "not found", "invalid" or
+        # "duplicate". An ID given more than once is ambiguous, so none of its rows are applied.
+        rows = list(rows)
+        outcomes = {}
+        valid = []
+        counts = Counter(row[0] for row in rows)
+        for row in rows:
+            s_id, name, *scores, course, year, section = (*row, None, None, None)[:9]
+            if counts[s_id] > 1:
+                outcomes[s_id] = "duplicate"
+                continue
+            try:
+                scores = [float(value) for value in scores]
+                year = None if year is None else int(year)
+            except (TypeError, ValueError):
+                outcomes[s_id] = "invalid"
+                continue
+            if not name or not _scores_in_range(scores) or not _segment_valid(course, year):
+                outcomes[s_id] = "invalid"
+            else:
+                valid.append((s_id, name, *scores, course, year, section))
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                existing = self._existing_ids(conn, [row[0] for row in valid])
+                valid = [row for row in valid if row[0] in existing]
+                old = self._scores_by_id(conn, [row[0] for row in valid])
+                conn.executemany(STUDENT_UPDATE, [(row[1], *row[6:], row[0]) for row in valid])
+                conn.executemany(
+                    "UPDATE grades SET attendance_rate=?, quiz_score=?, midterm_score=?, final_score=? WHERE student_foreign_id=?",
+                    [(*row[2:6], row[0]) for row in valid])
+                stamp = self._claim_stamp(conn) if valid else None
+        except Exception as e:
+            return False, str(e)
+
+        if valid:
+            self._mark_changed(list(old.values()), [tuple(row[2:6]) for row in valid if row[0] in old], stamp)
+        for s_id, *_ in valid:
+            outcomes[s_id] = "updated"
+        for s_id, *_ in rows:
+            outcomes.setdefault(s_id, "not found")
+        return True, outcomes
+
+    # --- BULK IMPORT ---
+    @profiled
+    def import_csv(self, csv_path, course="BSIT", year=3, section="", batch_size=IMPORT_BATCH_SIZE):
+        imported = 0
+        errors = []
+        seen_ids = set()
+        batch = []
+
+        with open(csv_path, mode='r', newline='', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file)
+            missing = [col for col in IMPORT_COLUMNS.values() if col not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+
+            for row in reader:
+                line = reader.line_num
+                record, error = self._parse_import_row(row, course, year, section)
+                if error:
+                    errors.append((line, error))
+                    continue
+                if record[0] in seen_ids:
+                    errors.append((line, f"Duplicate Student ID {record[0]} in file."))
+                    continue
+                seen_ids.add(record[0])
+                batch.append((line, record))
+
+                if len(batch) >= batch_size:
+                    imported += self._write_import_batch(batch, errors)
+                    batch = []
+
+            if batch:
+                imported += self._write_import_batch(batch, errors)
+
+        errors.sort()
+        return imported, errors
+
+    def _parse_import_row(self, row, course, year, section):
+        s_id = (row[IMPORT_COLUMNS["student_id"]] or "").strip()
+        name = (row[IMPORT_COLUMNS["name"]] or "").strip()
+        if not s_id or not name:
+            return None, "Name and ID are required."
+        if not STUDENT_ID_PATTERN.match(s_id):
+            return None, f"Invalid Student ID format: {s_id}"
+        try:
+            scores = [float(row[IMPORT_COLUMNS[key]]) for key in ("attendance", "quiz", "midterm", "final")]
+        except (TypeError, ValueError):
+            return None, f"Non-numeric score for {s_id}."
+        if not _scores_in_range(scores):
+            return None, f"Scores out of range 0-100 for {s_id}."
+
+        # Segment columns are optional; rows without them take the defaults passed to import_csv
+        course = (row.get("Course") or "").strip() or course
+        section = (row.get("Section") or "").strip() or section
+        try:
+            year = int(row.get("Year Level") or year)
+        except ValueError:
+            return None, f"Invalid Year Level for {s_id}."
+        return (s_id, name, course, year, section, *scores), None
+
+    def _existing_ids(self, conn, student_ids):
+        existing = set()
+        for chunk in _chunks(student_ids):
+            placeholders = ",".join("?" * len(chunk))
+            existing.update(row[0] for row in conn.execute(
+                f"SELECT student_id FROM students WHERE student_id IN ({placeholders})", chunk))
+        return existing
+
+    def _scores_by_id(self, conn, student_ids):
+        # {student_id: (attendance, quiz, midterm, final)} as stored before a write
+        scores = {}
+        for chunk in _chunks(student_ids):
+            placeholders = ",".join("?" * len(chunk))
+            for s_id, *row in conn.execute(
+                    "SELECT student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score FROM grades "
+                    f"WHERE student_foreign_id IN ({placeholders})", chunk):
+                scores[s_id] = tuple(row)
+        return scores
+
+    def _write_import_batch(self, batch, errors):
+        conn = self._connect()
+        with conn:
+            # IDs are checked inside the write transaction, so one inserted meanwhile by another engine is
+            # reported like any other existing ID instead of failing the batch on the UNIQUE constraint
+            conn.execute("BEGIN IMMEDIATE")
+            existing = self._existing_ids(conn, [record[0] for _, record in batch])
+            records = []
+            for line, record in batch:
+                if record[0] in existing:
+                    errors.append((line, f"Student ID {record[0]} already exists."))
+                else:
+                    records.append(record)
+            if not records:
+                return 0
+
+            # The insert triggers are dropped for the batch and put back before COMMIT, so no other
+            # connection ever sees them missing. New students get ids above last_id (AUTOINCREMENT).
+            triggers = conn.execute(
+                f"SELECT sql FROM sqlite_master WHERE type='trigger' AND name IN ({','.join('?' * len(IMPORT_BULK_TRIGGERS))})",
+                IMPORT_BULK_TRIGGERS).fetchall()
+            for name in IMPORT_BULK_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM students").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO students (student_id, full_name, course, year_level, section) VALUES (?, ?, ?, ?, ?)",
+                [r[:5] for r in records])
+            conn.executemany(
+                "INSERT INTO grades (student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score) VALUES (?, ?, ?, ?, ?)",
+                [(r[0], *r[5:]) for r in records])
+            conn.execute("INSERT INTO students_fts (rowid, student_id, full_name) "
+                         "SELECT id, student_id, full_name FROM students WHERE id > ?", (last_id,))
+            conn.execute("""
+                INSERT INTO grade_history (student_id, term_id, revision, attendance_rate, quiz_score, midterm_score, final_score)
+                    SELECT s.id, t.id, 0, g.attendance_rate, g.quiz_score, g.midterm_score, g.final_score
+                    FROM students s
+                    JOIN grades g ON s.student_id = g.student_foreign_id
+                    JOIN terms t ON t.is_current = 1
+                    WHERE s.id > ?
+            """, (last_id,))
+            for (sql,) in triggers:
+                conn.execute(sql)
+            stamp = self._claim_stamp(conn)
+        self._mark_changed([], [r[5:] for r in records], stamp)
+        return len(records)
@@ -1,35 +1,289 @@
+import threading
+
 import numpy as np
-from scipy import stats
+
+from src.profiler import profiled
+
+# Mirrors the "thresholds" block of config/settings.json
+DEFAULT_THRESHOLDS = {"passing": 75, "honors": 90, "min_attendance": 80}
+
+# Risk reason bits, as returned by classify()
+RISK_LOW_ATTENDANCE = 1
+RISK_FAILING = 2
+# Index with a risk bitmask
+RISK_LABELS = ("", "Low Attendance", "Failing Grades", "Low Attendance, Failing Grades")
+# Scatter plots above this size are drawn from a sample
+MAX_PLOT_POINTS = 5000
+
+
+class RunningRegression:
+    # Least squares from running sums, so rows can be added or removed without a refit.
+    # The sums live in one Gram matrix over [1, x1..xk, y]: for a single predictor its entries are
+    # n, Σx, Σy, Σxy, Σx² and Σy².
+    def __init__(self, n_features=1):
+        self.n_features = n_features
+        self.reset()
+
+    def reset(self):
+        size = self.n_features + 2
+        self.gram = np.zeros((size, size))
+
+    @classmethod
+    def from_sums(cls, n, sx, sy, sxy, sxx, syy):
+        # Single-predictor model from sums computed elsewhere, e.g. by a GROUP BY query
+        model = cls()
+        model.gram = np.array([[n, sx, sy], [sx, sxx, sxy], [sy, sxy, syy]], dtype=float)
+        return model
+
+    @property
+    def n(self):
+        return int(round(self.gram[0, 0]))
+
+    def add(self, x, y, sign=1):
+        y = np.asarray(y, dtype=float).reshape(-1)
+        x = np.asarray(x, dtype=float).reshape(len(y), self.n_features)
+        z = np.column_stack((np.ones(len(y)), x, y))
+        self.gram += sign * (z.T @ z)
+
+    def remove(self, x, y):
+        self.add(x, y, sign=-1)
+
+    def result(self):
+        # Raises ValueError when the predictors do not vary, like scipy's linregress did
+        n = self.gram[0, 0]
+        if n < 2:
+            return None
+        if self.n_features == 1:
+            return self._simple_result(n)
+        return self._multiple_result(n)
+
+    def _simple_result(self, n):
+        (_, sx, sy), (_, sxx, sxy), (_, _, syy) = self.gram
+        ss_x = sxx - sx * sx / n
+        ss_y = syy - sy * sy / n
+        ss_xy = sxy - sx * sy / n
+        if ss_x <= 1e-12 * max(sxx, 1.0):
+            raise ValueError("Cannot fit a trend: all x values are identical.")
+        slope = ss_xy / ss_x
+        r = ss_xy / np.sqrt(ss_x * ss_y) if ss_y > 1e-12 * max(syy, 1.0) else 0.0
+        r = float(np.clip(r, -1.0, 1.0))
+        return {
+            "slope": float(slope),
+            "intercept": float((sy - slope * sx) / n),
+            "r_squared": r ** 2,
+            "correlation": r
+        }
+
+    def _multiple_result(self, n):
+        # Normal equations solved with lstsq; O(k^3) in the number of predictors, independent of n
+        xtx, xty, yty = self.gram[:-1, :-1], self.gram[:-1, -1], self.gram[-1, -1]
+        coef, _, rank, _ = np.linalg.lstsq(xtx, xty, rcond=None)
+        if rank < len(coef):
+            raise ValueError("Cannot fit a model: predictors are constant or collinear.")
+        ss_total = yty - xty[0] ** 2 / n
+        ss_resid = yty - 2 * coef @ xty + coef @ xtx @ coef
+        r_squared = 1.0 - ss_resid / ss_total if ss_total > 1e-12 * max(yty, 1.0) else 0.0
+        r_squared = float(np.clip(r_squared, 0.0, 1.0))
+        return {
+            "intercept": float(coef[0]),
+            "coefficients": [float(c) for c in coef[1:]],
+            "r_squared": r_squared,
+            "correlation": float(np.sqrt(r_squared))
+        }
+
 
 class AnalyticsEngine:
-    def __init__(self, weights):
+    # Computed columns appended by DataEngine.export_csv
+    EXPORT_COLUMNS = ("Weighted GPA", "Status", "Risk Flags")
+
+    def __init__(self, weights, thresholds=None):
+        # Attendance -> GPA trend, kept current by on_data_change and reseeded when it falls behind.
+        # Reentrant: a poll inside attendance_trend can call on_data_change on the same thread.
+        self.trend = RunningRegression()
+        self._trend_version = None
+        self._trend_lock = threading.RLock()
+        self.set_weights(weights)
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+
+    def set_weights(self, weights):
+        # Safe to call at runtime; every GPA is derived from these on demand
         self.w_quiz = weights['quiz']
         self.w_mid = weights['midterm']
         self.w_final = weights['final']
+        self.weights = np.array([self.w_quiz, self.w_mid, self.w_final])
+        with self._trend_lock:
+            self._trend_version = None
 
     def calculate_weighted_gpa(self, q, m, f):
-        grades = np.array([q, m, f])
-        weights = np.array([self.w_quiz, self.w_mid, self.w_final])
-        return np.dot(grades, weights)
+        # Scalar path stays in plain Python; NumPy only pays off on whole columns
+        return q * self.w_quiz + m * self.w_mid + f * self.w_final
+
+    @profiled
+    def calculate_weighted_gpas(self, quiz, midterm=None, final=None):
+        # Either an N x 3 score matrix, or three score columns
+        if midterm is None:
+            scores = np.asarray(quiz, dtype=float).reshape(-1, 3)
+        else:
+            scores = np.column_stack((quiz, midterm, final)).astype(float, copy=False)
+        return scores @ self.weights
 
     def get_class_performance(self, all_grades):
-        if not all_grades: return 0, 0
-        avg_grade = np.mean(all_grades)
-        passing = sum(1 for g in all_grades if g >= 75)
-        pass_rate = (passing / len(all_grades)) * 100
+        all_grades = np.asarray(all_grades, dtype=float)
+        if all_grades.size == 0: return 0, 0
+        avg_grade = all_grades.mean()
+        passing = np.count_nonzero(all_grades >= self.thresholds['passing'])
+        pass_rate = (passing / all_grades.size) * 100
         return round(avg_grade, 2), round(pass_rate, 1)
 
+    @profiled
+    def classify(self, attendance, gpas):
+        # Boolean masks over whole columns; indices of honors / at-risk rows plus a risk bitmask per row
+        attendance = np.asarray(attendance, dtype=float)
+        gpas = np.asarray(gpas, dtype=float)
+        risk = np.where(attendance < self.thresholds['min_attendance'], RISK_LOW_ATTENDANCE, 0)
+        risk |= np.where(gpas < self.thresholds['passing'], RISK_FAILING, 0)
+        return {
+            "honors": np.flatnonzero(gpas >= self.thresholds['honors']),
+            "at_risk": np.flatnonzero(risk),
+            "risk": risk
+        }
+
+    def risk_label(self, mask):
+        return RISK_LABELS[mask]
+
+    @profiled
+    def export_columns(self, rows):
+        # rows are fetch_analytics_data tuples; one (gpa, status, risk) tuple per row
+        scores = np.array([row[2:6] for row in rows], dtype=float).reshape(-1, 4)
+        gpas = scores[:, 1:] @ self.weights
+        risk = self.classify(scores[:, 0], gpas)["risk"]
+        status = np.where(gpas >= self.thresholds['passing'], "PASS", "FAIL")
+        return [(round(float(gpa), 2), str(state), RISK_LABELS[mask]) for gpa, state, mask in zip(gpas, status, risk)]
+
+    @profiled
     def predict_performance(self, attendance_array, grades_array):
+        # One-off fit over full columns
         if len(attendance_array) < 2:
             return None
-        slope, intercept, r_value, p_value, std_err = stats.linregress(attendance_array, grades_array)
+        model = RunningRegression()
+        model.add(attendance_array, grades_array)
+        return model.result()
+
+    @profiled
+    def predict_from_scores(self, scores, target):
+        # Multi-variable fit: quiz / midterm / final (an N x 3 matrix) as predictors of target
+        if len(target) < 2:
+            return None
+        model = RunningRegression(n_features=3)
+        model.add(scores, target)
+        return model.result()
+
+    @profiled
+    def attendance_trend(self, db):
+        # O(1) while the running sums are in step with db; otherwise reseed once from the snapshot.
+        # The poll turns writes made through other engines into a reseed.
+        version = db.poll_changes()
+        with self._trend_lock:
+            if self._trend_version != version:
+                snap = db.get_snapshot()
+                self.trend.reset()
+                self.trend.add(snap["attendance"],
+                               self.calculate_weighted_gpas(snap["quiz"], snap["midterm"], snap["final"]))
+                self._trend_version = snap["version"]
+            return self.trend.result()
+
+    def on_data_change(self, version, removed, added):
+        # DataEngine change listener; rows are (attendance, quiz, midterm, final)
+        with self._trend_lock:
+            if self._trend_version is None:
+                return
+            if removed is None or version != self._trend_version + 1:
+                self._trend_version = None
+                return
+            for rows, sign in ((removed, -1), (added, 1)):
+                if len(rows):
+                    scores = np.asarray(rows, dtype=float).reshape(-1, 4)
+                    self.trend.add(scores[:, 0], scores[:, 1:] @ self.weights, sign)
+            self._trend_version = version
+
+    @profiled
+    def summarize_segments(self, segments):
+        # Adds averages, pass rate and the attendance/GPA correlation to DataEngine.get_segment_stats entries
+        for entry in segments:
+            count = entry["count"]
+            sum_att, sum_gpa, sum_att_gpa, sum_att_sq, sum_gpa_sq = entry["sums"]
+            try:
+                trend = RunningRegression.from_sums(count, sum_att, sum_gpa, sum_att_gpa, sum_att_sq, sum_gpa_sq).result()
+            except ValueError:
+                trend = None
+            entry["avg_gpa"] = round(sum_gpa / count, 2)
+            entry["avg_attendance"] = round(sum_att / count, 2)
+            entry["pass_rate"] = round(entry["passing"] / count * 100, 1)
+            entry["correlation"] = round(trend["correlation"], 3) if trend else None
+        return segments
+
+    @profiled
+    def student_trends(self, history):
+        # Per-student GPA trend over terms for every student at once, from DataEngine.fetch_grade_history.
+        # slope is the GPA change per term; NaN for students seen in a single term.
+        order = np.lexsort((history["term_ids"], history["student_keys"]))
+        gpas = self.calculate_weighted_gpas(history["quiz"][order], history["midterm"][order], history["final"][order])
+        keys, student = np.unique(history["student_keys"][order], return_inverse=True)
+        _, term = np.unique(history["term_ids"][order], return_inverse=True)
+        if len(keys) == 0:
+            empty = np.array([])
+            return {"student_keys": keys, "student_ids": empty, "terms": empty, "slope": empty,
+                    "intercept": empty, "latest_gpa": empty}
+
+        x = term.astype(float)
+        n = np.bincount(student, minlength=len(keys)).astype(float)
+        sx = np.bincount(student, x, len(keys))
+        sy = np.bincount(student, gpas, len(keys))
+        sxy = np.bincount(student, x * gpas, len(keys))
+        sxx = np.bincount(student, x * x, len(keys))
+        ss_x = sxx - sx * sx / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(ss_x > 1e-12, (sxy - sx * sy / n) / ss_x, np.nan)
+        last = np.append(np.flatnonzero(np.diff(student)), len(student) - 1)
         return {
+            "student_keys": keys,
+            "student_ids": history["student_ids"][order][last],
+            "terms": n.astype(int),
             "slope": slope,
-            "intercept": intercept,
-            "r_squared": r_value**2,
-            "correlation": r_value
+            "intercept": (sy - slope * sx) / n,
+            "latest_gpa": gpas[last]
         }
 
+    @profiled
+    def cohort_progression(self, history):
+        # Students grouped by the term they first appear in; one row per cohort, one column per term.
+        # Every cell comes from a single bincount over cohort * n_terms + term.
+        gpas = self.calculate_weighted_gpas(history["quiz"], history["midterm"], history["final"])
+        term_ids, term = np.unique(history["term_ids"], return_inverse=True)
+        _, student = np.unique(history["student_keys"], return_inverse=True)
+        n_terms = len(term_ids)
+
+        first = np.full(student.max() + 1 if len(student) else 0, n_terms)
+        np.minimum.at(first, student, term)
+        cell = first[student] * n_terms + term
+        size = n_terms * n_terms
+        counts = np.bincount(cell, minlength=size).reshape(n_terms, n_terms)
+        totals = np.bincount(cell, gpas, size).reshape(n_terms, n_terms)
+        passing = np.bincount(cell, gpas >= self.thresholds['passing'], size).reshape(n_terms, n_terms)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_gpa = np.where(counts > 0, totals / counts, np.nan)
+            pass_rate = np.where(counts > 0, passing / counts * 100, np.nan)
+        return {"term_ids": term_ids, "counts": counts, "avg_gpa": avg_gpa, "pass_rate": pass_rate}
+
+    @profiled
+    def sample_points(self, x, y, limit=MAX_PLOT_POINTS):
+        # N x 2 points for a scatter plot; a fixed seed keeps the sample stable between refreshes
+        points = np.column_stack((x, y))
+        if len(points) > limit:
+            keep = np.random.default_rng(0).choice(len(points), limit, replace=False)
+            points = points[np.sort(keep)]
+        return points
+
     def generate_insight_text(self, r_value):
         if r_value > 0.7:
             return "Analysis: Strong positive correlation.\nHigh attendance consistently leads to better grades."
@@ -0,0 +1,178 @@
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Mirrors the "diagnostics" block of config/settings.json
+DEFAULT_DIAGNOSTICS = {"enabled": False, "slow_query_ms": 100, "dump_path": "logs/diagnostics.json"}
+SLOW_LOG_SIZE = 500
+# SQL text and parameters are cut down to this many characters in the log
+SQL_PREVIEW = 200
+WHITESPACE = re.compile(r"\s+")
+
+
+class Profiler:
+    # Process-wide timings plus a slow-operation log. Every hook checks `enabled` first,
+    # so while profiling is off the cost is one attribute read per call.
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = DEFAULT_DIAGNOSTICS["slow_query_ms"]
+        self.dump_path = DEFAULT_DIAGNOSTICS["dump_path"]
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def configure(self, enabled=False, slow_query_ms=None, dump_path=None):
+        self.enabled = bool(enabled)
+        if slow_query_ms is not None: self.slow_ms = float(slow_query_ms)
+        if dump_path: self.dump_path = dump_path
+
+    def record(self, name, ms, detail=None):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += ms
+            stats[2] = max(stats[2], ms)
+            if ms >= self.slow_ms:
+                self._slow.append({"time": datetime.now().isoformat(timespec="seconds"), "name": name,
+                                   "ms": round(ms, 3), "thread": threading.current_thread().name,
+                                   "detail": detail})
+
+    def summary(self):
+        # One row per span name, most total time first
+        with self._lock:
+            rows = [{"name": name, "calls": count, "total_ms": round(total, 3), "avg_ms": round(total / count, 3),
+                     "max_ms": round(peak, 3)} for name, (count, total, peak) in self._stats.items()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def slow_log(self):
+        with self._lock:
+            return list(self._slow)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        folder = os.path.dirname(path)
+        if folder: os.makedirs(folder, exist_ok=True)
+        report = {"generated": datetime.now().isoformat(timespec="seconds"), "enabled": self.enabled,
+                  "slow_ms": self.slow_ms, "spans": self.summary(), "slow_log": self.slow_log()}
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
+
+
+PROFILER = Profiler()
+
+
+def profiled(fn):
+    # Times every call under the function's qualified name, e.g. "DataEngine.get_snapshot"
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            PROFILER.record(name, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+# --- SQL TRACING ---
+class ProfiledConnection(sqlite3.Connection):
+    # sqlite3.connect(factory=ProfiledConnection). While profiling is off, statements go straight to SQLite;
+    # while it is on they run on a ProfiledCursor.
+    def execute(self, sql, parameters=()):
+        if not PROFILER.enabled:
+            return super().execute(sql, parameters)
+        return self.cursor(ProfiledCursor).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not PROFILER.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor(ProfiledCursor).executemany(sql, seq_of_parameters)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    # A statement is recorded as soon as it has executed, under "sql: ...". Time spent fetching its rows is
+    # recorded separately under "sql fetch: ..." once they are consumed, or when the cursor is closed or freed,
+    # so results that are never exhausted are still counted.
+    _trace = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._record("sql: ", sql, (time.perf_counter() - start) * 1000, parameters)
+        if self.description is not None: self._trace = [sql, 0.0, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._record("sql: ", sql, (time.perf_counter() - start) * 1000, "executemany")
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if not rows: self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _timed(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        if self._trace is not None:
+            self._trace[1] += (time.perf_counter() - start) * 1000
+            if result is not None: self._trace[2] += len(result) if isinstance(result, list) else 1
+        return result
+
+    def _finish(self):
+        if self._trace is None: return
+        sql, ms, rows = self._trace
+        self._trace = None
+        if ms > 0: self._record("sql fetch: ", sql, ms, rows=rows)
+
+    def _record(self, prefix, sql, ms, params=None, rows=None):
+        text = WHITESPACE.sub(" ", sql).strip()[:SQL_PREVIEW]
+        if rows is None and self.description is None and self.rowcount >= 0: rows = self.rowcount
+        detail = {"sql": text, "rows": rows}
+        if params is not None: detail["params"] = repr(params)[:SQL_PREVIEW]
+        PROFILER.record(prefix + text, ms, detail)
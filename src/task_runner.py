@@ -0,0 +1,102 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskRunner:
+    # Runs DataEngine / AnalyticsEngine work off the Tk thread.
+    # Callbacks always run back on the Tk thread, drained from a queue with after().
+    def __init__(self, root, on_busy_change=None, poll_ms=30):
+        self.root = root
+        self.on_busy_change = on_busy_change
+        self.poll_ms = poll_ms
+        # A single worker keeps writes and the refreshes queued after them in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="edumatrix-worker")
+        self._results = queue.Queue()
+        self._latest = {}
+        self._futures = {}
+        # Bumped by cancel_all; callbacks from tasks submitted in an earlier epoch are dropped
+        self._epoch = 0
+        self._pending = 0
+        self._poll_id = None
+
+    def submit(self, key, fn, *args, on_success=None, on_error=None, on_progress=None):
+        # A new task with the same key supersedes the previous one: it is cancelled if it
+        # has not started yet, and its result is dropped if it has. key=None never supersedes.
+        generation = (self._epoch, self._latest.get(key, 0) + 1)
+        if key is not None:
+            self._latest[key] = generation[1]
+            previous = self._futures.pop(key, None)
+            if previous is not None:
+                previous.cancel()
+
+        kwargs = {}
+        if on_progress is not None:
+            kwargs["progress"] = lambda value: self._results.put(("progress", key, generation, value, on_progress))
+
+        future = self._executor.submit(fn, *args, **kwargs)
+        if key is not None:
+            self._futures[key] = future
+        self._set_pending(self._pending + 1)
+        future.add_done_callback(lambda f: self._results.put(("done", key, generation, f, (on_success, on_error))))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+        return future
+
+    def cancel_all(self):
+        # Drop every outstanding callback, keyed or not, e.g. when the widgets they target are destroyed.
+        # Keyed tasks that have not started are cancelled; unkeyed writes still run, only unreported.
+        self._epoch += 1
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+    def is_current(self, key, generation):
+        epoch, count = generation
+        return epoch == self._epoch and (key is None or self._latest.get(key) == count)
+
+    def shutdown(self):
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _set_pending(self, count):
+        was_busy = self._pending > 0
+        self._pending = count
+        if self.on_busy_change and was_busy != (count > 0):
+            self.on_busy_change(count > 0)
+
+    def _poll(self):
+        self._poll_id = None
+        try:
+            self._drain()
+        finally:
+            if self._pending > 0 or not self._results.empty():
+                self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _drain(self):
+        while True:
+            try:
+                kind, key, generation, payload, callbacks = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                if self.is_current(key, generation):
+                    callbacks(payload)
+                continue
+
+            self._set_pending(self._pending - 1)
+            if self._futures.get(key) is payload:
+                del self._futures[key]
+            if payload.cancelled() or not self.is_current(key, generation):
+                continue
+
+            on_success, on_error = callbacks
+            error = payload.exception()
+            if error is None:
+                if on_success: on_success(payload.result())
+            elif on_error:
+                on_error(error)
+            else:
+                self.root.report_callback_exception(type(error), error, error.__traceback__)
@@ -1,21 +1,65 @@
 import customtkinter as ctk
-from tkinter import messagebox, ttk
+from tkinter import messagebox, ttk, filedialog
 import tkinter as tk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
 from PIL import Image
 import re
+import math
 import platform
 import os
-import csv
 import json
-import sys  # ADDED: Needed for the restart command
+from collections import deque
 from datetime import datetime
 
+from src.task_runner import TaskRunner
+from src.profiler import PROFILER, profiled
+
 # Set Theme
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
+SEARCH_RESULT_LIMIT = 500
+# Pages of the records table kept in the Treeview; scrolling past them evicts the farthest page
+TABLE_WINDOW_PAGES = 3
+# Quiet time after the last keystroke before the search box queries
+SEARCH_DEBOUNCE_MS = 200
+# Records table header -> DataEngine sort key
+TABLE_SORT_KEYS = {"Name": "name", "ID": "student_id", "Attendance": "attendance", "Weighted GPA": "gpa"}
+# Segments tab "Group by" choice -> DataEngine.get_segment_stats levels
+SEGMENT_GROUPINGS = {
+    "Course": ("course",),
+    "Course + Year": ("course", "year_level"),
+    "Course + Year + Section": ("course", "year_level", "section"),
+}
+ALL_SEGMENTS = "All"
+NO_SECTION = "(none)"
+HISTOGRAM_BARS = "▁▂▃▄▅▆▇█"
+
+# Matplotlib is loaded by load_plotting() when the Intelligence Hub is first opened.
+# Charts use Figure directly rather than pyplot, so nothing is kept alive in pyplot's figure registry.
+Figure = None
+FigureCanvasTkAgg = None
+
+
+def load_plotting():
+    global Figure, FigureCanvasTkAgg
+    if Figure is None:
+        from matplotlib.figure import Figure as figure_class
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as canvas_class
+        Figure, FigureCanvasTkAgg = figure_class, canvas_class
+
+
+def histogram_text(counts):
+    # One bar character per GPA bucket, scaled to the tallest bucket
+    peak = max(counts) or 1
+    return "".join(HISTOGRAM_BARS[round(c / peak * (len(HISTOGRAM_BARS) - 1))] if c else " " for c in counts)
+
+
+def chart_colors():
+    # (background, text) for the current appearance mode
+    if ctk.get_appearance_mode() == "Dark":
+        return "#2b2b2b", "white"
+    return "#f0f0f0", "black"
+
 
 class ModernUI(ctk.CTk):
     def __init__(self, auth_callback, db_engine, math_engine, icon_path):
@@ -26,6 +70,12 @@ class ModernUI(ctk.CTk):
         self.icon_path = icon_path
 
         self.current_stats = None
+        # Persistent Matplotlib figures, created on first draw and updated in place afterwards
+        self.reg_chart = None
+        self.pie_chart = None
+        self.busy_bar = None
+        # Database and analytics work runs here; results come back on the Tk thread
+        self.tasks = TaskRunner(self, on_busy_change=self.set_busy)
 
         self.title("EduMatrix Enterprise Suite | PLV Edition")
 
@@ -54,6 +104,10 @@ class ModernUI(ctk.CTk):
 
     def on_close(self):
         if messagebox.askyesno("Exit System", "Are you sure you want to close the application?"):
+            self.cancel_search()
+            self.tasks.shutdown()
+            self.close_charts()
+            self.db.close()
             self.destroy()
 
     def play_sound(self, type="notify"):
@@ -73,6 +127,26 @@ class ModernUI(ctk.CTk):
         except:
             pass
 
+    def show_error(self, title, error):
+        self.play_sound("error")
+        messagebox.showerror(title, str(error))
+
+    def set_busy(self, busy):
+        if self.busy_bar is None or not self.busy_bar.winfo_exists(): return
+        if busy:
+            self.busy_bar.configure(mode="indeterminate")
+            self.busy_bar.pack(side="bottom", fill="x", padx=20, pady=(0, 10))
+            self.busy_bar.start()
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+
+    def show_progress(self, fraction):
+        if self.busy_bar is None or not self.busy_bar.winfo_exists(): return
+        self.busy_bar.stop()
+        self.busy_bar.configure(mode="determinate")
+        self.busy_bar.set(fraction)
+
     # --- LOGIN SCREEN ---
     def show_login(self):
         for widget in self.winfo_children(): widget.destroy()
@@ -136,6 +210,9 @@ class ModernUI(ctk.CTk):
 
     def logout(self):
         if messagebox.askyesno("Logout", "End current session?"):
+            self.cancel_search()
+            self.tasks.cancel_all()
+            self.close_charts()
             self.sidebar.destroy()
             self.content_area.destroy()
             self.show_login()
@@ -155,6 +232,7 @@ class ModernUI(ctk.CTk):
         self.create_nav_btn("Dashboard", "home", "🏠")
         self.create_nav_btn("Student Records", "records", "👥")
         self.create_nav_btn("Intelligence Hub", "analytics", "📈")
+        self.create_nav_btn("Segments", "segments", "🧩")
         self.create_nav_btn("Honors & Intervention", "honors", "🏅")
         self.create_nav_btn("System Settings", "settings", "⚙️")
         self.create_nav_btn("User Manual", "about", "ℹ️")
@@ -163,16 +241,23 @@ class ModernUI(ctk.CTk):
                       fg_color="#c0392b", hover_color="#e74c3c", height=45, font=("Arial", 12, "bold")).pack(
             side="bottom", pady=30, padx=20, fill="x")
 
+        # Shown by set_busy while background tasks are running
+        self.busy_bar = ctk.CTkProgressBar(self.sidebar, mode="indeterminate", progress_color="#3498db")
+
         self.content_area = ctk.CTkFrame(self, corner_radius=0, fg_color=("#f1f5f9", "#121212"))
         self.content_area.pack(side="right", fill="both", expand=True)
 
+        # Frames are built the first time their tab is opened
         self.frames = {}
-        self.frames["home"] = self.create_home_frame()
-        self.frames["records"] = self.create_records_frame()
-        self.frames["analytics"] = self.create_analytics_frame()
-        self.frames["honors"] = self.create_honors_frame()
-        self.frames["settings"] = self.create_settings_frame()
-        self.frames["about"] = self.create_about_frame()
+        self.frame_builders = {
+            "home": self.create_home_frame,
+            "records": self.create_records_frame,
+            "analytics": self.create_analytics_frame,
+            "segments": self.create_segments_frame,
+            "honors": self.create_honors_frame,
+            "settings": self.create_settings_frame,
+            "about": self.create_about_frame,
+        }
 
         self.switch_tab("home")
 
@@ -184,9 +269,11 @@ class ModernUI(ctk.CTk):
 
     def switch_tab(self, name):
         for frame in self.frames.values(): frame.pack_forget()
+        if name not in self.frames: self.frames[name] = self.frame_builders[name]()
         self.frames[name].pack(fill="both", expand=True, padx=30, pady=30)
         if name == "home": self.update_home_stats()
         if name == "honors": self.refresh_honors()
+        if name == "segments": self.refresh_segments()
 
     # --- TAB 1: HOME ---
     def create_home_frame(self):
@@ -225,14 +312,13 @@ class ModernUI(ctk.CTk):
         return card
 
     def update_home_stats(self):
+        self.tasks.submit("home_stats", self.db.get_summary_stats, on_success=self.show_home_stats)
+
+    def show_home_stats(self, summary):
         for widget in self.stats_grid.winfo_children(): widget.destroy()
-        data = self.db.fetch_analytics_data()
-        grades = [self.math.calculate_weighted_gpa(row[3], row[4], row[5]) for row in data]
-        summary = self.db.get_summary_stats()
-        avg_gpa, pass_rate = self.math.get_class_performance(grades)
         self.create_stat_card(self.stats_grid, "Total Students", str(summary['total']), "#2980b9")
-        self.create_stat_card(self.stats_grid, "Class Average (GPA)", f"{avg_gpa}", "#27ae60")
-        self.create_stat_card(self.stats_grid, "Pass Rate", f"{pass_rate}%", "#8e44ad")
+        self.create_stat_card(self.stats_grid, "Class Average (GPA)", f"{summary['avg_gpa']}", "#27ae60")
+        self.create_stat_card(self.stats_grid, "Pass Rate", f"{summary['pass_rate']}%", "#8e44ad")
 
     # --- TAB 2: RECORDS ---
     def create_records_frame(self):
@@ -247,7 +333,8 @@ class ModernUI(ctk.CTk):
             side="left", padx=(40, 10))
 
         self.search_var = ctk.StringVar()
-        self.search_var.trace("w", lambda name, index, mode, sv=self.search_var: self.run_search())
+        self.search_after = None
+        self.search_var.trace("w", lambda name, index, mode, sv=self.search_var: self.schedule_search())
         search_entry = ctk.CTkEntry(head, placeholder_text="Enter Name or ID...", width=300, height=40,
                                     textvariable=self.search_var)
         search_entry.pack(side="left")
@@ -278,6 +365,14 @@ class ModernUI(ctk.CTk):
         self.ent_m = self.create_labeled_entry(r2, "Midterm Score", f"Weight: {m_w}% (0-100)", "left")
         self.ent_f = self.create_labeled_entry(r2, "Finals Score", f"Weight: {f_w}% (0-100)", "left")
 
+        r3 = ctk.CTkFrame(fields, fg_color="transparent")
+        r3.pack(fill="x", pady=5)
+        self.ent_course = self.create_labeled_entry(r3, "Course", "Example: BSIT", "left")
+        self.ent_year = self.create_labeled_entry(r3, "Year Level", "1-6", "left")
+        self.ent_section = self.create_labeled_entry(r3, "Section", "Optional, e.g. A", "left")
+        self.ent_course.insert(0, "BSIT")
+        self.ent_year.insert(0, "3")
+
         ctk.CTkButton(input_panel, text="💾 SAVE RECORD", fg_color="#27ae60", hover_color="#2ecc71", width=200,
                       height=45,
                       font=("Arial", 14, "bold"), command=self.save_student).pack(pady=20)
@@ -290,9 +385,19 @@ class ModernUI(ctk.CTk):
 
         cols = ("Name", "ID", "Attendance", "Weighted GPA")
         self.tree = ttk.Treeview(table_frame, columns=cols, show="headings", height=8)
-        for col in cols: self.tree.heading(col, text=col, command=lambda c=col: self.sort_treeview(c, False))
+        for col in cols: self.tree.heading(col, text=col, command=lambda c=col: self.sort_treeview(c))
+
+        # Rows are fetched one page at a time as the list is scrolled, and only a window of pages is kept
+        self.tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_table_scroll)
+        self.tree_scroll.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
 
+        # None keeps the default order: by name when paging, by relevance when searching
+        self.table_sort = None
+        self.table_desc = False
+        self.reset_table_window()
+
         btn_box = ctk.CTkFrame(frame, fg_color="transparent")
         btn_box.pack(fill="x", pady=5)
 
@@ -304,6 +409,8 @@ class ModernUI(ctk.CTk):
                       hover_color="#e74c3c", height=35).pack(side="left", expand=True, padx=5)
         ctk.CTkButton(btn_box, text="📄 EXPORT CSV", command=self.export_csv, fg_color="#2980b9", hover_color="#3498db",
                       height=35).pack(side="right", expand=True, padx=5)
+        ctk.CTkButton(btn_box, text="📥 IMPORT CSV", command=self.import_csv, fg_color="#16a085", hover_color="#1abc9c",
+                      height=35).pack(side="right", expand=True, padx=5)
 
         return frame
 
@@ -314,7 +421,8 @@ class ModernUI(ctk.CTk):
             anchor="w")
         ent = ctk.CTkEntry(container, height=35)
         ent.pack(anchor="w", pady=(5, 0), fill="x")
-        ctk.CTkLabel(container, text=help_text, font=("Arial", 11), text_color="gray").pack(anchor="w")
+        ent.help_label = ctk.CTkLabel(container, text=help_text, font=("Arial", 11), text_color="gray")
+        ent.help_label.pack(anchor="w")
         return ent
 
     def save_student(self):
@@ -332,24 +440,39 @@ class ModernUI(ctk.CTk):
             att = float(self.ent_att.get())
             q, m, f = float(self.ent_q.get()), float(self.ent_m.get()), float(self.ent_f.get())
             if not (0 <= q <= 100 and 0 <= m <= 100 and 0 <= f <= 100 and 0 <= att <= 100): raise ValueError
-
-            success, msg = self.db.add_student_record(s_id, name, "BSIT", 3, att, q, m, f)
-            if success:
-                self.play_sound("success")
-                self.refresh_table()
-                self.ent_id.delete(0, 'end')
-                self.ent_name.delete(0, 'end')
-                self.ent_att.delete(0, 'end')
-                self.ent_q.delete(0, 'end')
-                self.ent_m.delete(0, 'end')
-                self.ent_f.delete(0, 'end')
-                messagebox.showinfo("Success", msg)
-            else:
-                self.play_sound("error")
-                messagebox.showerror("Database Error", msg)
-        except:
+        except ValueError:
             self.play_sound("error")
             messagebox.showerror("Input Error", "Values must be numbers 0-100.")
+            return
+        course = self.ent_course.get().strip().upper()
+        section = self.ent_section.get().strip().upper()
+        try:
+            year = int(self.ent_year.get())
+            if not course or not (1 <= year <= 6): raise ValueError
+        except ValueError:
+            self.play_sound("error")
+            messagebox.showerror("Input Error", "Course is required and Year Level must be 1-6.")
+            return
+
+        self.tasks.submit(None, self.db.add_student_record, s_id, name, course, year, att, q, m, f, section,
+                          on_success=self.on_student_saved,
+                          on_error=lambda e: self.show_error("Database Error", e))
+
+    def on_student_saved(self, result):
+        success, msg = result
+        if success:
+            self.play_sound("success")
+            self.refresh_table()
+            self.ent_id.delete(0, 'end')
+            self.ent_name.delete(0, 'end')
+            self.ent_att.delete(0, 'end')
+            self.ent_q.delete(0, 'end')
+            self.ent_m.delete(0, 'end')
+            self.ent_f.delete(0, 'end')
+            messagebox.showinfo("Success", msg)
+        else:
+            self.play_sound("error")
+            messagebox.showerror("Database Error", msg)
 
     def edit_student(self):
         selected = self.tree.selection()
@@ -358,22 +481,19 @@ class ModernUI(ctk.CTk):
             messagebox.showwarning("Selection Error", "Please select a student record to edit.")
             return
 
-        item = self.tree.item(selected)
-        s_id = item['values'][1]
+        s_id = self.tree.item(selected[0], 'values')[1]
+        self.tasks.submit("edit_lookup", self.db.get_student, s_id, on_success=self.open_edit_window,
+                          on_error=lambda e: self.show_error("Error", e))
 
-        raw_data = None
-        all_students = self.db.fetch_analytics_data()
-        for row in all_students:
-            if row[1] == s_id:
-                raw_data = row
-                break
-        if not raw_data: return
+    def open_edit_window(self, record):
+        if not record: return
+        s_id = record.student_id
 
         edit_window = ctk.CTkToplevel(self)
         edit_window.title(f"Edit Record: {s_id}")
 
         w = 500
-        h = 600
+        h = 700
         ws = self.winfo_screenwidth()
         hs = self.winfo_screenheight()
         x = int((ws / 2) - (w / 2))
@@ -395,81 +515,219 @@ class ModernUI(ctk.CTk):
         e_name.pack(fill="x", pady=(0, 2))
         ctk.CTkLabel(f_frame, text="Format: Last, First", font=("Arial", 10), text_color="gray").pack(anchor="w",
                                                                                                       pady=(0, 10))
-        e_name.insert(0, raw_data[0])
+        e_name.insert(0, record.full_name)
 
         ctk.CTkLabel(f_frame, text="Attendance %", font=("Arial", 12, "bold")).pack(anchor="w")
         e_att = ctk.CTkEntry(f_frame)
         e_att.pack(fill="x", pady=(0, 2))
         ctk.CTkLabel(f_frame, text="0-100 (No % symbol)", font=("Arial", 10), text_color="gray").pack(anchor="w",
                                                                                                       pady=(0, 10))
-        e_att.insert(0, str(raw_data[2]))
+        e_att.insert(0, str(record.attendance_rate))
 
         ctk.CTkLabel(f_frame, text="Quiz Score", font=("Arial", 12, "bold")).pack(anchor="w")
         e_q = ctk.CTkEntry(f_frame)
         e_q.pack(fill="x", pady=(0, 2))
         ctk.CTkLabel(f_frame, text=f"Weight: {q_w}% (0-100)", font=("Arial", 10), text_color="gray").pack(anchor="w",
                                                                                                           pady=(0, 10))
-        e_q.insert(0, str(raw_data[3]))
+        e_q.insert(0, str(record.quiz_score))
 
         ctk.CTkLabel(f_frame, text="Midterm Score", font=("Arial", 12, "bold")).pack(anchor="w")
         e_m = ctk.CTkEntry(f_frame)
         e_m.pack(fill="x", pady=(0, 2))
         ctk.CTkLabel(f_frame, text=f"Weight: {m_w}% (0-100)", font=("Arial", 10), text_color="gray").pack(anchor="w",
                                                                                                           pady=(0, 10))
-        e_m.insert(0, str(raw_data[4]))
+        e_m.insert(0, str(record.midterm_score))
 
         ctk.CTkLabel(f_frame, text="Finals Score", font=("Arial", 12, "bold")).pack(anchor="w")
         e_f = ctk.CTkEntry(f_frame)
         e_f.pack(fill="x", pady=(0, 2))
         ctk.CTkLabel(f_frame, text=f"Weight: {f_w}% (0-100)", font=("Arial", 10), text_color="gray").pack(anchor="w",
                                                                                                           pady=(0, 20))
-        e_f.insert(0, str(raw_data[5]))
+        e_f.insert(0, str(record.final_score))
+
+        seg_frame = ctk.CTkFrame(f_frame, fg_color="transparent")
+        seg_frame.pack(fill="x", pady=(0, 10))
+        e_course = self.create_labeled_entry(seg_frame, "Course", "Example: BSIT", "left")
+        e_year = self.create_labeled_entry(seg_frame, "Year Level", "1-6", "left")
+        e_section = self.create_labeled_entry(seg_frame, "Section", "Optional, e.g. A", "left")
+        e_course.insert(0, record.course)
+        e_year.insert(0, str(record.year_level))
+        e_section.insert(0, record.section)
+
+        def on_updated(result):
+            success, msg = result
+            if success:
+                self.play_sound("success")
+                self.refresh_table()
+                edit_window.destroy()
+                messagebox.showinfo("Updated", "Record updated successfully.")
+            else:
+                self.play_sound("error")
+                messagebox.showerror("Error", msg)
 
         def confirm_update():
             try:
                 att = float(e_att.get())
                 q, m, f = float(e_q.get()), float(e_m.get()), float(e_f.get())
                 if not (0 <= q <= 100 and 0 <= m <= 100 and 0 <= f <= 100 and 0 <= att <= 100): raise ValueError
-
-                success, msg = self.db.update_student_record(s_id, e_name.get(), att, q, m, f)
-                if success:
-                    self.play_sound("success")
-                    self.refresh_table()
-                    edit_window.destroy()
-                    messagebox.showinfo("Updated", "Record updated successfully.")
-                else:
-                    self.play_sound("error")
-                    messagebox.showerror("Error", msg)
-            except:
+            except ValueError:
                 self.play_sound("error")
                 messagebox.showerror("Error", "Invalid inputs. Use numbers 0-100.")
+                return
+            course = e_course.get().strip().upper()
+            section = e_section.get().strip().upper()
+            try:
+                year = int(e_year.get())
+                if not course or not (1 <= year <= 6): raise ValueError
+            except ValueError:
+                self.play_sound("error")
+                messagebox.showerror("Error", "Course is required and Year Level must be 1-6.")
+                return
+            self.tasks.submit(None, self.db.update_student_record, s_id, e_name.get(), att, q, m, f,
+                              course, year, section, on_success=on_updated, on_error=lambda e: self.show_error("Error", e))
 
         ctk.CTkButton(edit_window, text="CONFIRM UPDATE", command=confirm_update, fg_color="#2980b9", height=45).pack(
             pady=10, padx=20, fill="x")
 
+    # Methods ending in _job run on the worker thread and must not touch widgets. Methods that only submit
+    # a job are not @profiled: the job and the show_* method that renders its result are.
     def refresh_table(self):
         for i in self.tree.get_children(): self.tree.delete(i)
-        data = self.db.fetch_analytics_data()
-        for row in data:
-            gpa = self.math.calculate_weighted_gpa(row[3], row[4], row[5])
-            self.tree.insert("", "end", values=(row[0], row[1], f"{row[2]}%", f"{gpa:.2f}"))
+        self.reset_table_window()
+        self.page_exhausted = False
+        self.load_next_page()
+
+    def reset_table_window(self):
+        # table_pages holds [first key, last key, item ids] per loaded page, top to bottom.
+        # page_cursor continues below the window, page_head_cursor above it (None: nothing left that way).
+        self.table_pages = deque()
+        self.page_cursor = None
+        self.page_head_cursor = None
+        self.page_exhausted = True
+        self.page_pending = False
+
+    def load_next_page(self):
+        if self.page_exhausted or self.page_pending: return
+        self.page_pending = True
+        self.tasks.submit("table", self.table_page_job, self.table_sort or "name", self.page_cursor, None,
+                          self.table_desc, on_success=self.show_table_page)
+
+    def load_previous_page(self):
+        if self.page_head_cursor is None or self.page_pending: return
+        self.page_pending = True
+        self.tasks.submit("table", self.table_page_job, self.table_sort or "name", None, self.page_head_cursor,
+                          self.table_desc, on_success=self.show_table_page)
+
+    @profiled
+    def table_page_job(self, sort_by, after, before, descending):
+        data, cursor = self.db.fetch_page(sort_by, after=after, before=before, descending=descending, keys=True)
+        return data, self.math.calculate_weighted_gpas([row[3:6] for row in data]), cursor, before is not None
+
+    @profiled
+    def show_table_page(self, result):
+        data, gpas, cursor, backward = result
+        self.page_pending = False
+        if not data:
+            if backward: self.page_head_cursor = None
+            else: self.page_exhausted = True
+            return
+
+        def change():
+            items = self.insert_table_rows(data, gpas, 0 if backward else "end")
+            page = [tuple(data[0][6:]), tuple(data[-1][6:]), items]
+            if backward:
+                self.table_pages.appendleft(page)
+                self.page_head_cursor = cursor
+            else:
+                self.table_pages.append(page)
+                self.page_cursor = cursor
+                self.page_exhausted = cursor is None
+            if len(self.table_pages) > TABLE_WINDOW_PAGES:
+                # Drop the page farthest from where the user is heading; it can be fetched again by key
+                evicted = self.table_pages.pop() if backward else self.table_pages.popleft()
+                self.tree.delete(*evicted[2])
+                if backward:
+                    self.page_cursor = self.table_pages[-1][1]
+                    self.page_exhausted = False
+                else:
+                    self.page_head_cursor = self.table_pages[0][0]
+        self.keep_table_view(change)
+
+    def keep_table_view(self, change):
+        # Rows added or evicted above the viewport must not move the rows the user is looking at
+        items = self.tree.get_children()
+        anchor = items[min(len(items) - 1, int(self.tree.yview()[0] * len(items)))] if items else None
+        change()
+        items = self.tree.get_children()
+        if anchor and items and self.tree.exists(anchor):
+            self.tree.yview_moveto(self.tree.index(anchor) / len(items))
+
+    def on_table_scroll(self, first, last):
+        self.tree_scroll.set(first, last)
+        # Near either edge of the loaded window: fetch the neighbouring page
+        if float(last) > 0.9:
+            self.load_next_page()
+        elif float(first) < 0.1:
+            self.load_previous_page()
+
+    def insert_table_rows(self, data, gpas, index="end"):
+        items = []
+        for offset, (row, gpa) in enumerate(zip(data, gpas)):
+            position = index + offset if isinstance(index, int) else index
+            items.append(self.tree.insert("", position, values=(row[0], row[1], f"{row[2]}%", f"{gpa:.2f}")))
+        return items
+
+    def schedule_search(self):
+        # Every keystroke restarts the timer, so only the query typed before a pause runs
+        self.cancel_search()
+        self.search_after = self.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def cancel_search(self):
+        if getattr(self, "search_after", None):
+            self.after_cancel(self.search_after)
+            self.search_after = None
 
     def run_search(self):
+        self.cancel_search()
         query = self.search_var.get()
-        data = self.db.search_students(query)
+        if not query.strip():
+            self.refresh_table()
+            return
+        # Search results are ranked and capped, so paging stays off until the box is cleared
+        self.reset_table_window()
+        # Shares the "table" key with paging, so a newer keystroke drops any stale result
+        self.tasks.submit("table", self.search_job, query, self.table_sort, self.table_desc,
+                          on_success=self.show_search_results)
+
+    @profiled
+    def search_job(self, query, sort_by, descending):
+        data = self.db.search_students(query, limit=SEARCH_RESULT_LIMIT)
+        gpas = self.math.calculate_weighted_gpas([row[3:6] for row in data])
+        if sort_by:
+            # Results are capped, so re-ordering the raw tuples here is cheap
+            order = self.sort_search_results(data, gpas, sort_by, descending)
+            data, gpas = [data[i] for i in order], gpas[order]
+        return data, gpas
+
+    @profiled
+    def show_search_results(self, result):
         for i in self.tree.get_children(): self.tree.delete(i)
-        for row in data:
-            gpa = self.math.calculate_weighted_gpa(row[3], row[4], row[5])
-            self.tree.insert("", "end", values=(row[0], row[1], f"{row[2]}%", f"{gpa:.2f}"))
-
-    def sort_treeview(self, col, reverse):
-        l = [(self.tree.set(k, col), k) for k in self.tree.get_children('')]
-        try:
-            l.sort(key=lambda t: float(t[0].replace('%', '')), reverse=reverse)
-        except ValueError:
-            l.sort(reverse=reverse)
-        for index, (val, k) in enumerate(l): self.tree.move(k, '', index)
-        self.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
+        self.insert_table_rows(*result)
+
+    def sort_treeview(self, col):
+        # Header clicks re-query in the new order instead of shuffling widget items
+        key = TABLE_SORT_KEYS[col]
+        self.table_desc = not self.table_desc if key == self.table_sort else False
+        self.table_sort = key
+        self.run_search()
+
+    def sort_search_results(self, data, gpas, sort_by, descending):
+        if sort_by == "gpa":
+            key = lambda i: gpas[i]
+        else:
+            index = {"name": 0, "student_id": 1, "attendance": 2}[sort_by]
+            key = lambda i: data[i][index]
+        return sorted(range(len(data)), key=key, reverse=descending)
 
     def delete_student(self):
         selected = self.tree.selection()
@@ -478,38 +736,68 @@ class ModernUI(ctk.CTk):
             messagebox.showwarning("Selection Error", "Please select a record.")
             return
         if messagebox.askyesno("Confirm Delete", "This action cannot be undone."):
-            try:
-                for item in selected:
-                    self.db.delete_record(self.tree.item(item, 'values')[1])
-                self.play_sound("success")
-                self.refresh_table()
-            except Exception as e:
-                self.play_sound("error")
-                messagebox.showerror("Error", str(e))
+            ids = [self.tree.item(item, 'values')[1] for item in selected]
+            # Whole selection goes in one transaction
+            self.tasks.submit(None, self.db.delete_records, ids, on_success=self.on_records_deleted,
+                              on_error=lambda e: self.show_error("Error", e))
+
+    def on_records_deleted(self, result):
+        success, outcome = result
+        if not success:
+            self.show_error("Error", outcome)
+            return
+        self.play_sound("success")
+        self.refresh_table()
 
     def export_csv(self):
-        data = self.db.fetch_analytics_data()
-        if not data:
+        self.tasks.submit(None, self.export_job, on_success=self.on_export_done, on_progress=self.show_progress,
+                          on_error=lambda e: self.show_error("Export Error", e))
+
+    @profiled
+    def export_job(self, progress=None):
+        if self.db.count_records() == 0: return None
+        export_dir = "exports"
+        if not os.path.exists(export_dir):
+            os.makedirs(export_dir)
+        filename = f"{export_dir}/Student_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        # Streams straight from the cursor, with GPA / status / risk columns added per chunk
+        self.db.export_csv(filename, self.math, progress=progress)
+        return filename
+
+    def on_export_done(self, filename):
+        if not filename:
             messagebox.showwarning("Export Failed", "No data to export.")
             return
+        self.play_sound("success")
+        messagebox.showinfo("Export Success", f"Saved to:\n{filename}")
         try:
-            export_dir = "exports"
-            if not os.path.exists(export_dir):
-                os.makedirs(export_dir)
-            filename = f"{export_dir}/Student_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            with open(filename, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["Full Name", "Student ID", "Attendance %", "Quiz", "Midterm", "Finals"])
-                writer.writerows(data)
-            self.play_sound("success")
-            messagebox.showinfo("Export Success", f"Saved to:\n{filename}")
-            os.startfile(export_dir)
-        except Exception as e:
+            os.startfile(os.path.dirname(filename))
+        except Exception:
+            pass
+
+    def import_csv(self):
+        filename = filedialog.askopenfilename(title="Import Student Records",
+                                              filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")])
+        if not filename: return
+        self.tasks.submit(None, self.db.import_csv, filename, on_success=self.on_import_done,
+                          on_error=lambda e: self.show_error("Import Error", e))
+
+    def on_import_done(self, result):
+        imported, errors = result
+        self.refresh_table()
+        msg = f"Imported {imported} record(s)."
+        if errors:
             self.play_sound("error")
-            messagebox.showerror("Export Error", str(e))
+            details = "\n".join(f"Line {line}: {error}" for line, error in errors[:10])
+            more = f"\n...and {len(errors) - 10} more." if len(errors) > 10 else ""
+            messagebox.showwarning("Import Finished", f"{msg}\n{len(errors)} row(s) skipped:\n\n{details}{more}")
+        else:
+            self.play_sound("success")
+            messagebox.showinfo("Import Success", msg)
 
     # --- TAB 3: ANALYTICS ---
     def create_analytics_frame(self):
+        load_plotting()
         frame = ctk.CTkFrame(self.content_area, fg_color="transparent")
         ctk.CTkLabel(frame, text="Intelligence Hub", font=("Roboto", 28, "bold"), text_color=("black", "white")).pack(
             anchor="w", pady=(0, 10))
@@ -565,46 +853,85 @@ class ModernUI(ctk.CTk):
         return frame
 
     def run_regression(self):
-        data = self.db.fetch_analytics_data()
-        if len(data) < 2:
+        self.tasks.submit("regression", self.regression_job, on_success=self.show_regression,
+                          on_error=self.on_regression_error)
+
+    @profiled
+    def regression_job(self):
+        snap = self.db.get_snapshot()
+        if len(snap["ids"]) < 2: return None
+        stats = self.math.attendance_trend(self.db)
+        # Large classes are plotted from a sample; the trend line always uses every row
+        points = self.math.sample_points(snap["attendance"], snap["gpa"])
+        bounds = (snap["attendance"].min(), snap["attendance"].max(), snap["gpa"].min(), snap["gpa"].max())
+        return points, bounds, len(snap["ids"]), stats
+
+    def on_regression_error(self, error):
+        if isinstance(error, ValueError):
+            messagebox.showwarning("Data Error",
+                                   "Cannot predict trend: All students have the same Attendance rate.\nAdd varied data points.")
+        else:
+            self.show_error("Analytics Error", error)
+
+    @profiled
+    def show_regression(self, result):
+        if result is None:
             messagebox.showwarning("Insufficient Data", "Need at least 2 students.")
             return
 
-        attendance = [row[2] for row in data]
-        grades = [self.math.calculate_weighted_gpa(row[3], row[4], row[5]) for row in data]
-
-        try:
-            self.current_stats = self.math.predict_performance(attendance, grades)
-            stats = self.current_stats
-
-            for w in self.reg_canvas.winfo_children(): w.destroy()
-
-            bg_color = "#2b2b2b" if ctk.get_appearance_mode() == "Dark" else "#f0f0f0"
-            text_color = "white" if ctk.get_appearance_mode() == "Dark" else "black"
-
-            fig, ax = plt.subplots(figsize=(5, 3), facecolor=bg_color)
-            ax.set_facecolor(bg_color)
-            ax.scatter(attendance, grades, color="#00b894", label="Student Data")
-            line = [stats['slope'] * x + stats['intercept'] for x in attendance]
-            ax.plot(attendance, line, color="#e17055", linewidth=2, label="Trend Line")
-
-            ax.tick_params(axis='x', colors=text_color)
-            ax.tick_params(axis='y', colors=text_color)
+        points, (x_min, x_max, y_min, y_max), total, stats = result
+        self.current_stats = stats
+        if self.reg_chart is None: self.reg_chart = self.create_regression_chart()
+        chart = self.reg_chart
+        _, text_color = self.style_chart(chart)
+
+        chart["scatter"].set_offsets(points)
+        chart["scatter"].set_sizes([36 if len(points) < 500 else 8])
+        chart["line"].set_data([x_min, x_max], [stats['slope'] * x + stats['intercept'] for x in (x_min, x_max)])
+        label = "Student Data" if len(points) == total else f"Student Data ({len(points):,} of {total:,})"
+        chart["legend"].get_texts()[0].set_text(label)
+
+        x_pad = max((x_max - x_min) * 0.05, 1)
+        y_pad = max((y_max - y_min) * 0.05, 1)
+        chart["axes"].set_xlim(x_min - x_pad, x_max + x_pad)
+        chart["axes"].set_ylim(y_min - y_pad, y_max + y_pad)
+        chart["canvas"].draw_idle()
+
+        self.insight_label.configure(text=self.math.generate_insight_text(stats['correlation']),
+                                     text_color=text_color)
+
+    def create_regression_chart(self):
+        fig = Figure(figsize=(5, 3))
+        ax = fig.add_subplot()
+        scatter = ax.scatter([], [], color="#00b894", label="Student Data")
+        line, = ax.plot([], [], color="#e17055", linewidth=2, label="Trend Line")
+        ax.grid(color="gray", linestyle="--", linewidth=0.5, alpha=0.5)
+        legend = ax.legend(loc="upper left")
+
+        canvas = FigureCanvasTkAgg(fig, master=self.reg_canvas)
+        canvas.get_tk_widget().pack(fill="both", expand=True)
+        return {"figure": fig, "axes": ax, "canvas": canvas, "scatter": scatter, "line": line, "legend": legend}
+
+    def style_chart(self, chart):
+        # Re-applied on every update so a theme switch is picked up without rebuilding the figure
+        bg_color, text_color = chart_colors()
+        chart["figure"].set_facecolor(bg_color)
+        ax = chart["axes"]
+        ax.set_facecolor(bg_color)
+        ax.tick_params(axis='x', colors=text_color)
+        ax.tick_params(axis='y', colors=text_color)
+        if "scatter" in chart:
             ax.set_xlabel("Attendance (%)", color=text_color)
             ax.set_ylabel("Weighted GPA", color=text_color)
-            ax.grid(color="gray", linestyle="--", linewidth=0.5, alpha=0.5)
-            ax.legend()
-
-            canvas = FigureCanvasTkAgg(fig, master=self.reg_canvas)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True)
+        return bg_color, text_color
 
-            self.insight_label.configure(text=self.math.generate_insight_text(stats['correlation']),
-                                         text_color=text_color)
-
-        except ValueError:
-            messagebox.showwarning("Data Error",
-                                   "Cannot predict trend: All students have the same Attendance rate.\nAdd varied data points.")
+    def close_charts(self):
+        for chart in (self.reg_chart, self.pie_chart):
+            if chart is None: continue
+            chart["canvas"].get_tk_widget().destroy()
+            chart["figure"].clear()
+        self.reg_chart = None
+        self.pie_chart = None
 
     def calculate_prediction(self):
         if not self.current_stats:
@@ -619,31 +946,128 @@ class ModernUI(ctk.CTk):
             messagebox.showerror("Input Error", "Enter 0-100.")
 
     def run_pie_chart(self):
-        data = self.db.fetch_analytics_data()
-        if len(data) == 0:
+        self.tasks.submit("distribution", self.distribution_job, on_success=self.show_pie_chart,
+                          on_error=lambda e: self.show_error("Analytics Error", e))
+
+    @profiled
+    def distribution_job(self):
+        grades = self.db.get_snapshot()["gpa"]
+        if len(grades) == 0: return None
+        passing = int((grades >= self.math.thresholds['passing']).sum())
+        return passing, len(grades) - passing
+
+    @profiled
+    def show_pie_chart(self, result):
+        if result is None:
             messagebox.showwarning("No Data", "Add records first.")
             return
-
-        grades = [self.math.calculate_weighted_gpa(row[3], row[4], row[5]) for row in data]
-        passing = sum(1 for g in grades if g >= 75)
-        failing = len(grades) - passing
-
-        for w in self.pie_canvas.winfo_children(): w.destroy()
-
-        bg_color = "#2b2b2b" if ctk.get_appearance_mode() == "Dark" else "#f0f0f0"
-        text_color = "white" if ctk.get_appearance_mode() == "Dark" else "black"
-
-        fig, ax = plt.subplots(figsize=(5, 3), facecolor=bg_color)
+        passing, failing = result
         if passing == 0 and failing == 0:
             messagebox.showinfo("Data", "No grades available.")
             return
 
-        ax.pie([passing, failing], labels=['Passing', 'Fail / At Risk'], autopct='%1.1f%%',
-               colors=['#00b894', '#d63031'], textprops={'color': text_color})
+        if self.pie_chart is None: self.pie_chart = self.create_pie_chart()
+        chart = self.pie_chart
+        _, text_color = self.style_chart(chart)
+
+        # Same layout ax.pie would produce, applied to the existing wedges and labels
+        total = passing + failing
+        start = 0.0
+        for wedge, label, pct, value in zip(chart["wedges"], chart["labels"], chart["pcts"], (passing, failing)):
+            sweep = 360.0 * value / total
+            wedge.set_theta1(start)
+            wedge.set_theta2(start + sweep)
+            mid = math.radians(start + sweep / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment("left" if x > 0 else "right")
+            pct.set_position((0.6 * x, 0.6 * y))
+            pct.set_text(f"{100.0 * value / total:.1f}%")
+            for text in (label, pct):
+                text.set_color(text_color)
+                text.set_visible(value > 0)
+            start += sweep
+        chart["canvas"].draw_idle()
+
+    def create_pie_chart(self):
+        fig = Figure(figsize=(5, 3))
+        ax = fig.add_subplot()
+        wedges, labels, pcts = ax.pie([1, 1], labels=['Passing', 'Fail / At Risk'], autopct='%1.1f%%',
+                                      colors=['#00b894', '#d63031'])
 
         canvas = FigureCanvasTkAgg(fig, master=self.pie_canvas)
-        canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True)
+        return {"figure": fig, "axes": ax, "canvas": canvas, "wedges": wedges, "labels": labels, "pcts": pcts}
+
+    # --- SEGMENTS ---
+    def create_segments_frame(self):
+        frame = ctk.CTkFrame(self.content_area, fg_color="transparent")
+        ctk.CTkLabel(frame, text="Segment Analytics", font=("Roboto", 28, "bold"),
+                     text_color=("black", "white")).pack(anchor="w", pady=(0, 10))
+
+        filters = ctk.CTkFrame(frame, fg_color=("white", "#1e1e1e"), corner_radius=10)
+        filters.pack(fill="x", pady=(0, 10), ipady=5)
+        self.segment_filters = {}
+        for label, level in (("Course", "course"), ("Year", "year_level"), ("Section", "section")):
+            ctk.CTkLabel(filters, text=f"{label}:", font=("Arial", 12, "bold")).pack(side="left", padx=(15, 5))
+            menu = ctk.CTkOptionMenu(filters, values=[ALL_SEGMENTS], width=110,
+                                     command=lambda _: self.refresh_segments())
+            menu.pack(side="left")
+            self.segment_filters[level] = menu
+
+        ctk.CTkLabel(filters, text="Group by:", font=("Arial", 12, "bold")).pack(side="left", padx=(25, 5))
+        self.segment_grouping = ctk.CTkOptionMenu(filters, values=list(SEGMENT_GROUPINGS), width=200,
+                                                  command=lambda _: self.refresh_segments())
+        self.segment_grouping.set("Course + Year + Section")
+        self.segment_grouping.pack(side="left")
+
+        table_bg = ctk.CTkFrame(frame, fg_color=("white", "#1e1e1e"), corner_radius=10)
+        table_bg.pack(fill="both", expand=True, pady=10)
+        cols = ("Segment", "Students", "Avg GPA", "Pass Rate", "Avg Attendance", "Attendance r", "GPA Distribution")
+        self.tree_segments = ttk.Treeview(table_bg, columns=cols, show="headings", height=15)
+        for col in cols:
+            self.tree_segments.heading(col, text=col)
+            self.tree_segments.column(col, width=90, anchor="center")
+        self.tree_segments.column("Segment", width=200, anchor="w")
+        self.tree_segments.column("GPA Distribution", width=140)
+        self.tree_segments.pack(fill="both", expand=True, padx=15, pady=15)
+
+        ctk.CTkButton(frame, text="🔄 REFRESH SEGMENTS", command=self.refresh_segments, fg_color="#002366").pack(pady=10)
+        return frame
+
+    def refresh_segments(self):
+        filters = {}
+        for level, menu in self.segment_filters.items():
+            value = menu.get()
+            if value != ALL_SEGMENTS: filters[level] = int(value) if level == "year_level" else value
+        if filters.get("section") == NO_SECTION: filters["section"] = ""
+        group_by = SEGMENT_GROUPINGS[self.segment_grouping.get()]
+        self.tasks.submit("segments", self.segments_job, group_by, filters, on_success=self.show_segments,
+                          on_error=lambda e: self.show_error("Analytics Error", e))
+
+    @profiled
+    def segments_job(self, group_by, filters):
+        options = self.db.get_segment_options()
+        segments = self.math.summarize_segments(self.db.get_segment_stats(group_by, **filters))
+        return options, segments
+
+    @profiled
+    def show_segments(self, result):
+        options, segments = result
+        for index, level in enumerate(("course", "year_level", "section")):
+            values = sorted({str(row[index]) if row[index] != "" else NO_SECTION for row in options if row[index] is not None})
+            self.segment_filters[level].configure(values=[ALL_SEGMENTS] + values)
+
+        for i in self.tree_segments.get_children(): self.tree_segments.delete(i)
+        for entry in segments:
+            segment = entry["segment"]
+            parts = [segment["course"] or "-"]
+            if "year_level" in segment: parts.append(f"Year {segment['year_level']}")
+            if "section" in segment: parts.append(f"Sec {segment['section'] or '-'}")
+            r = entry["correlation"]
+            self.tree_segments.insert("", "end", values=(
+                " · ".join(parts), entry["count"], f"{entry['avg_gpa']:.2f}", f"{entry['pass_rate']}%",
+                f"{entry['avg_attendance']:.1f}%", "--" if r is None else f"{r:.2f}", histogram_text(entry["histogram"])))
 
     # --- TAB 4: HONORS & INTERVENTION ---
     def create_honors_frame(self):
@@ -656,7 +1080,7 @@ class ModernUI(ctk.CTk):
 
         left_frame = ctk.CTkFrame(container, fg_color=("white", "#1e1e1e"), corner_radius=10)
         left_frame.pack(side="left", fill="both", expand=True, padx=(0, 10), pady=10)
-        ctk.CTkLabel(left_frame, text="🏆 Dean's List (GPA > 90)", font=("Arial", 16, "bold"),
+        ctk.CTkLabel(left_frame, text=f"🏆 Dean's List (GPA > {self.math.thresholds['honors']})", font=("Arial", 16, "bold"),
                      text_color="#f1c40f").pack(pady=10)
 
         self.tree_honors = ttk.Treeview(left_frame, columns=("Name", "GPA"), show="headings", height=15)
@@ -679,26 +1103,23 @@ class ModernUI(ctk.CTk):
         return frame
 
     def refresh_honors(self):
+        self.tasks.submit("honors", self.honors_job, on_success=self.show_honors,
+                          on_error=lambda e: self.show_error("Analytics Error", e))
+
+    @profiled
+    def honors_job(self):
+        # Classification runs in SQL, so only flagged students leave the database
+        honors, at_risk = self.db.fetch_flagged_students()
+        return ([(name, f"{gpa:.2f}") for name, _, gpa in honors],
+                [(name, self.math.risk_label(mask)) for name, _, _, _, mask in at_risk])
+
+    @profiled
+    def show_honors(self, result):
+        honors, at_risk = result
         for i in self.tree_honors.get_children(): self.tree_honors.delete(i)
         for i in self.tree_risk.get_children(): self.tree_risk.delete(i)
-
-        data = self.db.fetch_analytics_data()
-        if not data: return
-
-        for row in data:
-            name = row[0]
-            attendance = row[2]
-            gpa = self.math.calculate_weighted_gpa(row[3], row[4], row[5])
-
-            if gpa >= 90:
-                self.tree_honors.insert("", "end", values=(name, f"{gpa:.2f}"))
-
-            risk_reasons = []
-            if attendance < 80: risk_reasons.append("Low Attendance")
-            if gpa < 75: risk_reasons.append("Failing Grades")
-
-            if risk_reasons:
-                self.tree_risk.insert("", "end", values=(name, ", ".join(risk_reasons)))
+        for values in honors: self.tree_honors.insert("", "end", values=values)
+        for values in at_risk: self.tree_risk.insert("", "end", values=values)
 
     # --- TAB 5: SETTINGS (FIXED SAFE SAVE) ---
     def create_settings_frame(self):
@@ -729,8 +1150,105 @@ class ModernUI(ctk.CTk):
         ctk.CTkButton(card, text="SAVE CONFIGURATION", command=self.save_settings, fg_color="#e67e22",
                       hover_color="#d35400").grid(row=5, column=1, padx=20, pady=20, sticky="e")
 
+        term_card = ctk.CTkFrame(frame, fg_color=("white", "#1e1e1e"), corner_radius=10)
+        term_card.pack(fill="x", padx=20, pady=10)
+        ctk.CTkLabel(term_card, text="Academic Term", font=("Arial", 14, "bold"),
+                     text_color="#3498db").grid(row=0, column=0, columnspan=2, padx=20, pady=(20, 5), sticky="w")
+        self.term_label = ctk.CTkLabel(term_card, text="Current term: --", font=("Arial", 12))
+        self.term_label.grid(row=1, column=0, columnspan=2, padx=30, pady=5, sticky="w")
+        self.term_ent = ctk.CTkEntry(term_card, width=220, placeholder_text="e.g. 2026-2027 1st Sem")
+        self.term_ent.grid(row=2, column=0, padx=30, pady=(5, 20), sticky="w")
+        ctk.CTkButton(term_card, text="START NEW TERM", command=self.start_term, fg_color="#8e44ad",
+                      hover_color="#9b59b6").grid(row=2, column=1, padx=20, pady=(5, 20), sticky="e")
+        self.refresh_term()
+
+        diag_card = ctk.CTkFrame(frame, fg_color=("white", "#1e1e1e"), corner_radius=10)
+        diag_card.pack(fill="x", padx=20, pady=10)
+        ctk.CTkLabel(diag_card, text="Diagnostics", font=("Arial", 14, "bold"),
+                     text_color="#3498db").grid(row=0, column=0, columnspan=3, padx=20, pady=(20, 5), sticky="w")
+        # Runtime toggle; the startup default is "diagnostics.enabled" in settings.json
+        self.profiling_switch = ctk.CTkSwitch(diag_card, text=f"Record timings (slow log above {PROFILER.slow_ms:g} ms)",
+                                              command=self.toggle_profiling)
+        if PROFILER.enabled: self.profiling_switch.select()
+        self.profiling_switch.grid(row=1, column=0, padx=30, pady=(5, 20), sticky="w")
+        ctk.CTkButton(diag_card, text="VIEW", width=90, command=self.show_diagnostics,
+                      fg_color="#34495e").grid(row=1, column=1, padx=5, pady=(5, 20))
+        ctk.CTkButton(diag_card, text="DUMP TO FILE", width=120, command=self.dump_diagnostics,
+                      fg_color="#34495e").grid(row=1, column=2, padx=(5, 20), pady=(5, 20))
+
         return frame
 
+    def toggle_profiling(self):
+        PROFILER.enabled = bool(self.profiling_switch.get())
+
+    def show_diagnostics(self):
+        window = ctk.CTkToplevel(self)
+        window.title("Diagnostics")
+        window.geometry("900x600")
+
+        ctk.CTkLabel(window, text="Timings", font=("Roboto", 16, "bold")).pack(anchor="w", padx=15, pady=(15, 5))
+        cols = ("Name", "Calls", "Total ms", "Avg ms", "Max ms")
+        spans = ttk.Treeview(window, columns=cols, show="headings", height=10)
+        for col in cols:
+            spans.heading(col, text=col)
+            spans.column(col, width=90, anchor="e")
+        spans.column("Name", width=450, anchor="w")
+        spans.pack(fill="both", expand=True, padx=15)
+        for row in PROFILER.summary():
+            spans.insert("", "end", values=(row["name"], row["calls"], row["total_ms"], row["avg_ms"], row["max_ms"]))
+
+        ctk.CTkLabel(window, text=f"Slow operations (>= {PROFILER.slow_ms:g} ms)",
+                     font=("Roboto", 16, "bold")).pack(anchor="w", padx=15, pady=(15, 5))
+        cols = ("Time", "Name", "ms", "Detail")
+        slow = ttk.Treeview(window, columns=cols, show="headings", height=10)
+        for col in cols: slow.heading(col, text=col)
+        slow.column("Time", width=140)
+        slow.column("Name", width=300)
+        slow.column("ms", width=70, anchor="e")
+        slow.column("Detail", width=350)
+        slow.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+        for entry in reversed(PROFILER.slow_log()):
+            slow.insert("", "end", values=(entry["time"], entry["name"], entry["ms"], entry["detail"] or ""))
+
+    def dump_diagnostics(self):
+        try:
+            path = PROFILER.dump()
+        except OSError as e:
+            self.show_error("Diagnostics Error", e)
+            return
+        messagebox.showinfo("Diagnostics", f"Diagnostics written to:\n{path}")
+
+    def refresh_term(self):
+        self.tasks.submit("term", self.db.get_current_term, on_success=self.show_term,
+                          on_error=lambda e: self.show_error("Database Error", e))
+
+    def show_term(self, term):
+        text = f"Current term: {term.name} (since {term.started_at[:10]})" if term else "Current term: --"
+        self.term_label.configure(text=text)
+
+    def start_term(self):
+        name = self.term_ent.get().strip()
+        if not name:
+            self.play_sound("error")
+            messagebox.showwarning("Input Error", "Enter a name for the new term.")
+            return
+        if not messagebox.askyesno("Start New Term",
+                                   f"Start '{name}'?\nCurrent grades carry over; later edits are recorded in the new term."):
+            return
+        self.tasks.submit(None, self.db.start_term, name, on_success=self.on_term_started,
+                          on_error=lambda e: self.show_error("Database Error", e))
+
+    def on_term_started(self, result):
+        success, msg = result
+        if success:
+            self.play_sound("success")
+            self.term_ent.delete(0, 'end')
+            self.refresh_term()
+            messagebox.showinfo("Success", msg)
+        else:
+            self.play_sound("error")
+            messagebox.showerror("Database Error", msg)
+
     def create_config_entry(self, parent, label, value, r):
         ctk.CTkLabel(parent, text=label, font=("Arial", 12)).grid(row=r, column=0, padx=30, pady=5, sticky="w")
         ent = ctk.CTkEntry(parent, width=100)
@@ -763,13 +1281,50 @@ class ModernUI(ctk.CTk):
             with open(config_path, 'w') as file:
                 json.dump(current_data, file, indent=4)
 
-            if messagebox.askyesno("Restart Required",
-                                   "Configuration saved successfully.\n\nNew grading weights will only apply after a restart.\n\nDo you want to restart the application now?"):
-                self.destroy()
-                os.execl(sys.executable, sys.executable, *sys.argv)
-
         except Exception as e:
             messagebox.showerror("Error", f"Invalid Input: {str(e)}")
+            return
+
+        # Applied live: queued behind any running work so no task sees half-updated weights
+        self.tasks.submit(None, self.apply_weights_job, current_data['grading_weights'],
+                          on_success=self.on_weights_applied,
+                          on_error=lambda e: self.show_error("Settings Error", e))
+
+    def apply_weights_job(self, weights):
+        self.math.set_weights(weights)
+        # Rebuilds the GPA index and invalidates the cached snapshot
+        self.db.set_grading_weights(weights)
+
+    def on_weights_applied(self, result):
+        # Tabs that were never opened pick the new weights up when they are built
+        if "records" in self.frames:
+            q_w = int(self.math.w_quiz * 100)
+            m_w = int(self.math.w_mid * 100)
+            f_w = int(self.math.w_final * 100)
+            self.ent_q.help_label.configure(text=f"Weight: {q_w}% (0-100)")
+            self.ent_m.help_label.configure(text=f"Weight: {m_w}% (0-100)")
+            self.ent_f.help_label.configure(text=f"Weight: {f_w}% (0-100)")
+            self.run_search()
+
+        # The about page only shows the weights in static text, so drop it and let it rebuild
+        about = self.frames.pop("about", None)
+        if about is not None:
+            about_visible = about.winfo_ismapped()
+            about.destroy()
+            if about_visible: self.switch_tab("about")
+
+        # Recompute every GPA-derived view in place
+        self.update_home_stats()
+        if "honors" in self.frames: self.refresh_honors()
+        if "segments" in self.frames: self.refresh_segments()
+        self.current_stats = None
+        if "analytics" in self.frames:
+            self.pred_result.configure(text="--")
+            if self.reg_chart is not None: self.run_regression()
+            if self.pie_chart is not None: self.run_pie_chart()
+
+        self.play_sound("success")
+        messagebox.showinfo("Settings Saved", "Configuration saved successfully.\nNew grading weights are now active.")
 
     # --- TAB 6: ABOUT ---
     def create_about_frame(self):
@@ -800,7 +1355,7 @@ class ModernUI(ctk.CTk):
                                  "• Language: Python 3.10+\n"
                                  "• UI Framework: CustomTkinter\n"
                                  "• Database: SQLite3 (Normalized Schema)\n"
-                                 "• AI Engine: SciPy (Linear Regression) & NumPy\n"
+                                 "• AI Engine: NumPy (Incremental Least-Squares Regression)\n"
                                  "• Visualization: Matplotlib")
 
         self.create_wiki_section(frame, "🏆", "Development Team",
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.data_engine import DataEngine
+from src.math_core import AnalyticsEngine
+
+WEIGHTS = {"quiz": 0.2, "midterm": 0.4, "final": 0.4}
+
+
+class GradeHistoryAcrossTermsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DataEngine(os.path.join(self.tmp.name, "history.db"), WEIGHTS)
+        self.math = AnalyticsEngine(WEIGHTS)
+        self.db.add_student_record("24-0001", "Unedited, Student", "BSIT", 1, 90, 80, 80, 80)
+        self.db.add_student_record("24-0002", "Edited, Student", "BSIT", 1, 90, 70, 70, 70)
+        success, _ = self.db.start_term("Second Term")
+        self.assertTrue(success)
+        self.db.update_student_record("24-0002", "Edited, Student", 95, 90, 90, 90)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_unedited_student_carries_over_to_new_term(self):
+        history = self.db.fetch_grade_history(["24-0001"])
+        terms = [term.id for term in self.db.get_terms()]
+        self.assertEqual(list(history["term_ids"]), terms)
+        self.assertEqual(list(history["quiz"]), [80.0, 80.0])
+
+    def test_edited_student_keeps_latest_revision_per_term(self):
+        history = self.db.fetch_grade_history(["24-0002"])
+        self.assertEqual(list(history["quiz"]), [70.0, 90.0])
+
+    def test_trends_and_cohorts_cover_every_student(self):
+        history = self.db.fetch_grade_history()
+        trends = self.math.student_trends(history)
+        self.assertEqual(list(trends["terms"]), [2, 2])
+        self.assertEqual(list(trends["slope"]), [0.0, 20.0])
+
+        cohorts = self.math.cohort_progression(history)
+        self.assertEqual(cohorts["counts"].tolist(), [[2, 2], [0, 0]])
+        self.assertTrue(np.allclose(cohorts["avg_gpa"][0], [75.0, 85.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.data_engine import DataEngine, SORT_COLUMNS
+
+PAGE = 7
+
+
+class KeysetPagingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DataEngine(os.path.join(self.tmp.name, "paging.db"))
+        # Few distinct names and scores, so pages split runs of equal sort values
+        for i in range(45):
+            score = 60 + (i % 4) * 10
+            self.db.add_student_record(f"24-{i:04d}", f"Student, {'ABC'[i % 3]}", "BSIT", 1,
+                                       score, score, score, score)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def forward_pages(self, sort_by, descending):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = self.db.fetch_page(sort_by, after=cursor, limit=PAGE, descending=descending, keys=True)
+            if rows: pages.append(rows)
+            if cursor is None:
+                return pages
+
+    def test_backward_pages_reproduce_forward_pages(self):
+        for sort_by in SORT_COLUMNS:
+            for descending in (False, True):
+                with self.subTest(sort_by=sort_by, descending=descending):
+                    pages = self.forward_pages(sort_by, descending)
+                    self.assertEqual(sum(len(rows) for rows in pages), 45)
+                    for previous, page in zip(pages, pages[1:]):
+                        rows, cursor = self.db.fetch_page(sort_by, limit=PAGE, descending=descending,
+                                                          before=page[0][6:], keys=True)
+                        self.assertEqual(rows, previous)
+                        self.assertEqual(cursor, previous[0][6:])
+
+    def test_backward_from_first_page_is_empty(self):
+        first = self.forward_pages("name", False)[0]
+        self.assertEqual(self.db.fetch_page("name", limit=PAGE, before=first[0][6:]), ([], None))
+
+
+if __name__ == "__main__":
+    unittest.main()
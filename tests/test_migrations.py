@@ -0,0 +1,89 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.data_engine import DataEngine, SCHEMA_MIGRATIONS
+
+BASELINE_DB = os.path.join(BASE_DIR, "database", "academic_data.db")
+# Schema of a database created before migrations existed (user_version 0)
+V0_SCHEMA = """
+    CREATE TABLE students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT UNIQUE NOT NULL,
+        full_name TEXT NOT NULL,
+        course TEXT,
+        year_level INTEGER
+    );
+    CREATE TABLE grades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_foreign_id TEXT,
+        attendance_rate REAL,
+        quiz_score REAL,
+        midterm_score REAL,
+        final_score REAL,
+        FOREIGN KEY(student_foreign_id) REFERENCES students(student_id)
+    );
+"""
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_copy(self, source):
+        # The tracked database is never opened by DataEngine itself, only a copy of it
+        path = os.path.join(self.tmp.name, "migrated.db")
+        shutil.copyfile(source, path)
+        return path
+
+    def assert_current(self, db):
+        conn = db._connect()
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], len(SCHEMA_MIGRATIONS))
+        conn.execute("INSERT INTO students_fts (students_fts) VALUES ('integrity-check')")
+
+    def test_baseline_database_migrates_to_current_version(self):
+        conn = sqlite3.connect(f"file:{BASELINE_DB}?mode=ro", uri=True)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 0)
+        students = conn.execute("SELECT student_id, full_name FROM students ORDER BY student_id").fetchall()
+        conn.close()
+
+        with DataEngine(self.open_copy(BASELINE_DB)) as db:
+            self.assert_current(db)
+            records = db.get_students([s_id for s_id, _ in students])
+            self.assertEqual(sorted((r.student_id, r.full_name) for r in records.values()), students)
+            self.assertEqual(len(db.fetch_grade_history()["student_ids"]), len(students))
+            s_id, name = students[0]
+            self.assertIn(s_id, [row[1] for row in db.search_students(name.split(",")[0])])
+
+    def test_duplicate_and_orphan_grades_are_dropped(self):
+        path = os.path.join(self.tmp.name, "v0.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(V0_SCHEMA + """
+            INSERT INTO students (student_id, full_name, course, year_level) VALUES ('23-0001', 'Cruz, Ben', 'BSIT', 2);
+            INSERT INTO grades (student_foreign_id, attendance_rate, quiz_score, midterm_score, final_score)
+                VALUES ('23-0001', 80, 70, 70, 70), ('23-0001', 90, 85, 85, 85), ('99-9999', 50, 50, 50, 50);
+        """)
+        conn.close()
+
+        with DataEngine(path) as db:
+            self.assert_current(db)
+            self.assertEqual(db.count_records(), 1)
+            record = db.get_student("23-0001")
+            self.assertEqual((record.quiz_score, record.course, record.year_level, record.section),
+                             (85.0, "BSIT", 2, ""))
+            self.assertEqual(db._connect().execute("SELECT COUNT(*) FROM grades").fetchone()[0], 1)
+            db.delete_record("23-0001")
+            self.assertEqual(db._connect().execute("SELECT COUNT(*) FROM grades").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import itertools
+import os
+import sys
+import tempfile
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.data_engine import DataEngine
+
+STUDENTS = [
+    ("23-3316", "Santos-Reyes, Ana"),
+    ("23-3317", "Peña, José"),
+    ("23-0412", "Santos, Maria"),
+    ("33-2345", "Cruz, Ben"),
+    ("24-0033", "O'Brien, Al"),
+    ("24-1100", "Reyes, Ángel"),
+]
+QUERIES = ["s", "sa", "santos", "santos-r", "santos-reyes a", "reyes", "re", "2", "23", "23-3", "23-33",
+           "23-3316", "3316", "p", "pe", "peña", "pena", "jos", "o", "o'b", "c", "cr b", "33-2", "ang", "ana"]
+
+
+class SearchCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DataEngine(os.path.join(self.tmp.name, "search.db"))
+        for s_id, name in STUDENTS:
+            self.db.add_student_record(s_id, name, "BSIT", 1, 90, 80, 80, 80)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def fresh(self, query):
+        self.db._search_cache.clear()
+        return self.db.search_students(query)
+
+    def test_id_serials_and_hyphenated_names_match(self):
+        self.assertEqual([row[1] for row in self.fresh("3316")], ["23-3316"])
+        self.assertEqual({row[1] for row in self.fresh("reyes")}, {"23-3316", "24-1100"})
+        self.assertEqual([row[1] for row in self.fresh("santos-re")], ["23-3316"])
+        self.assertEqual([row[1] for row in self.fresh("pena")], ["23-3317"])
+
+    def test_filtered_cache_matches_fts(self):
+        for base, query in itertools.permutations(QUERIES, 2):
+            expected = sorted(self.fresh(query))
+            self.db.search_students(base)
+            with self.subTest(base=base, query=query):
+                self.assertEqual(sorted(self.db.search_students(query)), expected)
+
+    def test_narrowed_query_is_served_from_cache(self):
+        self.db.search_students("sa")
+        queries = []
+        query_search = self.db._query_search
+        self.db._query_search = lambda *args: queries.append(args) or query_search(*args)
+        self.assertEqual({row[1] for row in self.db.search_students("santos-reyes")}, {"23-3316"})
+        self.assertEqual(queries, [])
+
+    def test_other_engines_writes_invalidate_the_cache(self):
+        self.assertEqual(self.db.search_students("zed"), [])
+        with DataEngine(self.db.db_path) as other:
+            other.add_student_record("23-0099", "Zed, Alpha", "BSIT", 1, 90, 90, 90, 90)
+        self.assertEqual([row[1] for row in self.db.search_students("zed")], ["23-0099"])
+
+
+if __name__ == "__main__":
+    unittest.main()